@@ -1,10 +1,24 @@
 # app/main.py
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from routers import auth, mascotas, clientes, citas, funcionarios, vacunas, diagnosticos, upload, dashboard
+import asyncio
+import time
 
-app = FastAPI()
+from core.cache import cache, cache_sync
+from core.config import settings
+from core.metrics import registry
+from core.middleware import CompressionMiddleware, ETagMiddleware, MetricsMiddleware
+from core.responses import FastJSONResponse
+from core.tasks import tasks
+from db.repository import db
+from services import vacunas as vacunas_service
+from services.vacunas_pendientes import pendientes
+
+from routers import auth, mascotas, clientes, citas, funcionarios, vacunas, diagnosticos, upload, dashboard, export, busqueda
+
+app = FastAPI(default_response_class=FastJSONResponse)
 
 # Configuración de CORS
 app.add_middleware(
@@ -15,6 +29,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ETag / 304 para lecturas y compresión gzip/brotli de cuerpos grandes
+app.add_middleware(ETagMiddleware)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_BYTES)
+
+# Latencia por ruta (el más externo, para medir también los demás middlewares)
+app.add_middleware(MetricsMiddleware)
+
 # Incluir routers
 app.include_router(auth.router)
 app.include_router(mascotas.router)
@@ -25,7 +46,57 @@ app.include_router(vacunas.router)
 app.include_router(diagnosticos.router)
 app.include_router(upload.router)
 app.include_router(dashboard.router)
+app.include_router(export.router)
+app.include_router(busqueda.router)
+
+async def _warm_up():
+    # Cada paso es independiente: si uno falla se registra y la app arranca igual
+    steps = [
+        ("base de datos", lambda: db.count("Funcionario")),  # crea el cliente y abre la primera conexión
+        ("catálogo de vacunas", vacunas_service.get_catalog),
+        ("dashboard", lambda: cache.get_or_load("dashboard", dashboard._load_dashboard_data)),
+    ]
+    for name, step in steps:
+        start = time.perf_counter()
+        try:
+            await step()
+            print(f"Warm-up: {name} listo en {(time.perf_counter() - start) * 1000:.0f} ms")
+        except Exception as e:
+            print(f"Warm-up: error precargando {name}: {str(e)}")
+
+@app.on_event("startup")
+async def startup():
+    # uvicorn no acepta conexiones hasta que termina el startup
+    await tasks.start()
+    if settings.WARMUP_ENABLED:
+        await _warm_up()
+    # Trabajos periódicos en segundo plano (no retrasan el arranque)
+    app.state.background_jobs = [
+        asyncio.ensure_future(pendientes.run_periodically(settings.VACUNAS_PENDIENTES_INTERVALO)),
+    ]
+    if settings.CACHE_SYNC_INTERVAL_SECONDS > 0:
+        app.state.background_jobs.append(
+            asyncio.ensure_future(cache_sync.run_periodically(settings.CACHE_SYNC_INTERVAL_SECONDS)),
+        )
+
+@app.on_event("shutdown")
+async def shutdown():
+    for job in getattr(app.state, "background_jobs", []):
+        job.cancel()
+    # Espera las tareas encoladas (lo que no termina a tiempo queda en el registro de fallos)
+    await tasks.stop(settings.TASK_QUEUE_DRAIN_SECONDS)
+    close = getattr(db.backend, "close", None)
+    if close is not None:
+        close()
 
 @app.get("/")
 async def root():
     return {"message": "API funcionando correctamente"}
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return cache.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
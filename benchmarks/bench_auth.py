@@ -0,0 +1,45 @@
+"""
+Coste por petición de la verificación del token (dependencia ``verify_token``).
+
+Compara jwt.decode en cada llamada (comportamiento anterior) con la caché de
+tokens verificados de ``core.security``, reutilizando el mismo token como hace
+una sesión real.
+
+Uso: SECRET_KEY=... python -m benchmarks.bench_auth [--iteraciones 50000]
+"""
+import argparse
+import time
+
+import jwt
+
+from core.config import settings
+from core.security import _decode_token, _token_cache, create_access_token
+
+
+def _per_call_us(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main(iterations: int) -> None:
+    token = create_access_token({"sub": "vet@clinica.com", "role": "Veterinario", "nombre": "vet", "id": 1})
+
+    def sin_cache():
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+    def con_cache():
+        return _decode_token(token)[0]  # lo que hace verify_token
+
+    _token_cache.clear()
+    print(f"{iterations} verificaciones del mismo token")
+    print(f"  sin caché  {_per_call_us(sin_cache, iterations):8.2f} µs/petición")
+    print(f"  con caché  {_per_call_us(con_cache, iterations):8.2f} µs/petición")
+    print(f"  caché: {_token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iteraciones", type=int, default=50000)
+    main(parser.parse_args().iteraciones)
@@ -0,0 +1,71 @@
+"""
+Throughput de creación de citas: una petición por fila (POST /citas/) frente
+al endpoint por lotes (POST /citas/lote), contra el backend en memoria con una
+latencia de base de datos simulada.
+
+Uso: SECRET_KEY=... python -m benchmarks.bench_bulk [--filas 2000] [--latencia-ms 5]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ["DB_BACKEND"] = "fake"
+
+import httpx
+
+from app import app
+from core.security import create_access_token
+from db.fake_backend import FakeBackend
+from db.repository import db
+from services.disponibilidad import index as disponibilidad, to_hora
+
+
+def _cita(i: int) -> dict:
+    # Huecos distintos por veterinario, para que ninguna cita choque con otra
+    hueco = i // 5
+    return {
+        "id_mascota": i % 100 + 1,
+        "fecha_cita": f"2026-{hueco // 560 % 12 + 1:02d}-{hueco // 20 % 28 + 1:02d}",
+        "id_veterinario": i % 5 + 1,
+        "hora_cita": to_hora(8 * 60 + 30 * (hueco % 20)),
+    }
+
+
+async def main(rows: int, latency_ms: float, concurrency: int) -> None:
+    token = create_access_token({"sub": "vet@clinica.com", "role": "Veterinario", "nombre": "vet", "id": 1})
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        db.use_backend(FakeBackend(latency_ms=latency_ms))
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def single(i):
+            async with semaphore:
+                response = await client.post("/citas/", json=_cita(i))
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(single(i) for i in range(rows)))
+        single_rate = rows / (time.perf_counter() - start)
+
+        db.use_backend(FakeBackend(latency_ms=latency_ms))
+        disponibilidad.clear()
+        start = time.perf_counter()
+        response = await client.post("/citas/lote", json=[_cita(i) for i in range(rows)])
+        response.raise_for_status()
+        bulk_rate = rows / (time.perf_counter() - start)
+
+    print(f"{rows} citas, latencia simulada {latency_ms} ms")
+    print(f"  {f'fila a fila ({concurrency} concurrentes)':<32} {single_rate:10.1f} filas/s")
+    print(f"  {'POST /citas/lote':<32} {bulk_rate:10.1f} filas/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=1000)
+    parser.add_argument("--latencia-ms", type=float, default=5)
+    parser.add_argument("--concurrencia", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.filas, args.latencia_ms, args.concurrencia))
@@ -0,0 +1,199 @@
+"""
+Búsqueda por nombre/correo sobre 100k mascotas, clientes y funcionarios.
+
+Con ``--dsn`` mide la función ``buscar`` de db/sql/busqueda.sql en un Postgres
+de verdad: crea un esquema temporal con las tres tablas, instala el script,
+inserta los registros (el coste incluye los triggers que mantienen el índice),
+comprueba los resultados contra el ``FakeBackend`` y mide la latencia por tipo
+de consulta (prefijo corto, fragmento, nombre completo, correo y términos muy
+frecuentes). Necesita psycopg2, que no es una dependencia de la API.
+
+Sin ``--dsn`` mide lo mismo con el ``FakeBackend`` (db/fake_search.py), junto a
+lo que hace hoy el frontend: descargar los listados completos y filtrar.
+
+Uso: python -m benchmarks.bench_busqueda [--registros 100000] [--dsn postgresql://...]
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from pathlib import Path
+
+os.environ["DB_BACKEND"] = "fake"
+
+from db.fake_backend import FakeBackend
+from db.fake_search import normalize
+from db.repository import db
+from services import busqueda as busqueda_service
+
+SQL = Path(__file__).parent.parent / "db" / "sql" / "busqueda.sql"
+SCHEMA = "bench_busqueda"
+
+NOMBRES = ["María", "José", "Lucía", "Andrés", "Valeria", "Sofía", "Mateo", "Camila", "Diego", "Gabriela",
+           "Sebastián", "Daniela", "Tomás", "Isabella", "Joaquín", "Mariana", "Emilio", "Renata"]
+APELLIDOS = ["González", "Rodríguez", "Jiménez", "Vargas", "Rojas", "Mora", "Solís", "Araya", "Castro",
+             "Alfaro", "Quesada", "Chaves", "Méndez", "Sánchez", "Ramírez", "Villalobos", "Calderón"]
+MASCOTAS = ["Max", "Luna", "Rocky", "Coco", "Toby", "Nala", "Simba", "Kira", "Bruno", "Lola", "Milo",
+            "Canela", "Chispa", "Pelusa", "Firulais", "Manchas", "Tommy", "Princesa", "Oreo", "Zeus"]
+DOMINIOS = ["gmail.com", "hotmail.com", "yahoo.com", "outlook.com", "clinica.com"]
+
+CONSULTAS = {
+    "prefijo corto": ["m", "ma", "lu", "ro", "ca"],
+    "fragmento": ["ales", "quez", "chis", "ofia"],
+    "nombre completo": ["maria gonzalez", "jose vargas", "luna", "sebastian mora"],
+    "correo": ["lucia.rojas", "tomas.castro4", "gabriela@", "diego.solis12"],
+    "muy frecuente": ["gmail", "a", "com", "ma a"],
+}
+
+TABLAS = """
+create table "Clientes" (id bigserial primary key, nombre_usuario text, correo text, "contraseña" text);
+create table "Funcionario" (id bigserial primary key, nombre text, puesto text, correo text, "contraseña" text);
+create table "Mascotas" (
+    id bigserial primary key, nombre_mascota text, especie text, raza text, fecha_nacimiento text,
+    "id_dueño" bigint, image_url text
+);
+"""
+
+
+def _filas(n: int) -> dict:
+    rng = random.Random(5)
+    funcionarios = max(1, n // 20)
+    clientes = n * 35 // 100
+    mascotas = n - clientes - funcionarios
+
+    def persona(i):
+        nombre, apellido = rng.choice(NOMBRES), rng.choice(APELLIDOS)
+        correo = normalize(f"{nombre}.{apellido}{i % 50}@{rng.choice(DOMINIOS)}")
+        return f"{nombre} {apellido}", correo
+
+    filas = {"Clientes": [], "Funcionario": []}
+    for i in range(clientes):
+        nombre, correo = persona(i)
+        filas["Clientes"].append({"nombre_usuario": nombre, "correo": correo, "contraseña": "x"})
+    for i in range(funcionarios):
+        nombre, correo = persona(i)
+        filas["Funcionario"].append({"nombre": nombre, "puesto": "Veterinario", "correo": correo, "contraseña": "x"})
+    filas["Mascotas"] = [{
+        "nombre_mascota": f"{rng.choice(MASCOTAS)} {rng.choice(APELLIDOS)}", "especie": "Perro", "raza": "Mestizo",
+        "fecha_nacimiento": "2020-01-01", "id_dueño": rng.randint(1, clientes), "image_url": None,
+    } for _ in range(mascotas)]
+    return filas
+
+
+def _seed(filas: dict) -> FakeBackend:
+    backend = FakeBackend()
+    for table in ("Clientes", "Funcionario", "Mascotas"):
+        backend.seed(table, filas[table])
+    return backend
+
+
+async def _naive(q: str, limit: int) -> list:
+    # Lo que hace hoy el frontend: descargar los listados completos y filtrar
+    term = normalize(q)
+    mascotas, clientes = await asyncio.gather(db.select("Mascotas"), db.select("Clientes"))
+    encontrados = [m for m in mascotas.data if term in normalize(m["nombre_mascota"])]
+    encontrados += [c for c in clientes.data if term in normalize(c["nombre_usuario"]) or term in c["correo"]]
+    return encontrados[:limit]
+
+
+def _ms(latencias: list, p: int) -> float:
+    latencias = sorted(latencias)
+    return latencias[min(len(latencias) - 1, len(latencias) * p // 100)] * 1000
+
+
+def _informe(grupo: str, latencias: list) -> None:
+    print(f"  {grupo:<18} p50 {_ms(latencias, 50):7.3f} ms  p99 {_ms(latencias, 99):7.3f} ms")
+
+
+def _postgres(dsn: str, filas: dict, repeticiones: int, limit: int) -> None:
+    try:
+        import psycopg2
+        from psycopg2.extras import execute_values
+    except ImportError:
+        raise SystemExit("--dsn necesita psycopg2 (pip install psycopg2-binary)")
+
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f"drop schema if exists {SCHEMA} cascade; create schema {SCHEMA}; set search_path to {SCHEMA}")
+    try:
+        cur.execute(TABLAS)
+        cur.execute(SQL.read_text(encoding="utf-8"))
+        start = time.perf_counter()
+        for table, columnas in (
+            ("Clientes", ("nombre_usuario", "correo", "contraseña")),
+            ("Funcionario", ("nombre", "puesto", "correo", "contraseña")),
+            ("Mascotas", ("nombre_mascota", "especie", "raza", "fecha_nacimiento", "id_dueño", "image_url")),
+        ):
+            nombres = ", ".join('"' + columna + '"' for columna in columnas)
+            execute_values(
+                cur, f'insert into "{table}" ({nombres}) values %s',
+                [tuple(fila[c] for c in columnas) for fila in filas[table]], page_size=1000,
+            )
+        total = sum(len(rows) for rows in filas.values())
+        segundos = time.perf_counter() - start
+        cur.execute('select count(*) from "BusquedaTerminos"')
+        terminos = cur.fetchone()[0]
+        cur.execute("analyze")
+        print(f"  inserción con triggers          {segundos * 1e6 / total:10.1f} µs/fila ({terminos} términos)")
+
+        def buscar(q):
+            cur.execute("select buscar(%s, null, %s)", (q, limit))
+            return cur.fetchone()[0]
+
+        # Mismos resultados que el FakeBackend (los ids coinciden: mismas filas en el mismo orden)
+        db.use_backend(_seed(filas))
+        distintos = [
+            q for consultas in CONSULTAS.values() for q in consultas
+            if [(r["tipo"], r["id"]) for r in buscar(q)]
+            != [(r["tipo"], r["id"]) for r in asyncio.run(busqueda_service.buscar(q, limit))]
+        ]
+        print(f"  resultados distintos del fake   {distintos or 'ninguno'}")
+
+        for grupo, consultas in CONSULTAS.items():
+            latencias = []
+            for _ in range(repeticiones):
+                for q in consultas:
+                    start = time.perf_counter()
+                    buscar(q)
+                    latencias.append(time.perf_counter() - start)
+            _informe(grupo, latencias)
+    finally:
+        cur.execute(f"drop schema if exists {SCHEMA} cascade")
+        conn.close()
+
+
+async def _fake(filas: dict, repeticiones: int, limit: int) -> None:
+    start = time.perf_counter()
+    backend = _seed(filas)
+    db.use_backend(backend)
+    print(f"  carga con índice                  {(time.perf_counter() - start) * 1000:10.2f} ms ({len(backend._busqueda)} documentos)")
+
+    start = time.perf_counter()
+    await _naive("maria", limit)
+    print(f"  sin índice (descarga + filtro)    {(time.perf_counter() - start) * 1000:10.2f} ms/consulta")
+
+    for grupo, consultas in CONSULTAS.items():
+        latencias = []
+        for _ in range(repeticiones):
+            for q in consultas:
+                start = time.perf_counter()
+                await busqueda_service.buscar(q, limit)
+                latencias.append(time.perf_counter() - start)
+        _informe(grupo, latencias)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--registros", type=int, default=100000)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--dsn", help="Postgres donde medir db/sql/busqueda.sql (se crea y borra el esquema bench_busqueda)")
+    args = parser.parse_args()
+    filas = _filas(args.registros)
+    print(f"{args.registros} registros (mascotas, clientes y funcionarios), {'Postgres' if args.dsn else 'FakeBackend'}")
+    if args.dsn:
+        _postgres(args.dsn, filas, args.repeticiones, args.limit)
+    else:
+        asyncio.run(_fake(filas, args.repeticiones, args.limit))
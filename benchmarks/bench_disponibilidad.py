@@ -0,0 +1,80 @@
+"""
+Comprobación de choques de agenda con decenas de miles de citas existentes.
+
+Compara descargar todas las citas y recorrerlas (la única opción sin índice)
+con ``services.disponibilidad``: primera consulta de un día (carga perezosa) y
+consultas siguientes (búsqueda binaria en memoria).
+
+Uso: python -m benchmarks.bench_disponibilidad [--citas 50000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+os.environ["DB_BACKEND"] = "fake"
+
+from db.fake_backend import FakeBackend
+from db.repository import db
+from services.disponibilidad import AvailabilityIndex, to_hora, to_minutes
+
+VETERINARIOS = 20
+
+
+def _seed(n: int) -> FakeBackend:
+    rng = random.Random(7)
+    backend = FakeBackend()
+    dias = max(1, n // (VETERINARIOS * 12))
+    backend.seed("Citas", [{
+        "id_mascota": rng.randint(1, 5000),
+        "id_veterinario": rng.randint(1, VETERINARIOS),
+        "fecha_cita": f"2026-D{rng.randrange(dias):04d}",
+        "hora_cita": to_hora(8 * 60 + 30 * rng.randrange(20)),
+    } for _ in range(n)])
+    return backend
+
+
+async def _naive(veterinario: int, fecha: str, hora: str) -> bool:
+    inicio = to_minutes(hora)
+    citas = (await db.select("Citas")).data
+    return any(
+        c["id_veterinario"] == veterinario and c["fecha_cita"] == fecha
+        and abs(to_minutes(c["hora_cita"]) - inicio) < 30
+        for c in citas
+    )
+
+
+async def main(n: int, checks: int) -> None:
+    db.use_backend(_seed(n))
+    rng = random.Random(11)
+    consultas = [(rng.randint(1, VETERINARIOS), "2026-D0001", to_hora(8 * 60 + 15 * rng.randrange(40))) for _ in range(checks)]
+
+    start = time.perf_counter()
+    for consulta in consultas[:20]:
+        await _naive(*consulta)
+    naive_ms = (time.perf_counter() - start) / 20 * 1000
+
+    index = AvailabilityIndex(duration=30, max_days=100000, ttl=float("inf"))
+    start = time.perf_counter()
+    for veterinario in range(1, VETERINARIOS + 1):
+        await index.conflict(veterinario, "2026-D0001", "09:00")
+    cold_ms = (time.perf_counter() - start) / VETERINARIOS * 1000
+
+    start = time.perf_counter()
+    for consulta in consultas:
+        await index.conflict(*consulta)
+    warm_us = (time.perf_counter() - start) / checks * 1e6
+
+    print(f"{n} citas existentes, {VETERINARIOS} veterinarios")
+    print(f"  sin índice (descarga + recorrido)   {naive_ms:10.2f} ms/consulta")
+    print(f"  índice, primera consulta del día    {cold_ms:10.2f} ms/consulta")
+    print(f"  índice, consultas siguientes        {warm_us:10.2f} µs/consulta")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--citas", type=int, default=50000)
+    parser.add_argument("--consultas", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(main(args.citas, args.consultas))
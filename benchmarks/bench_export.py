@@ -0,0 +1,58 @@
+"""
+Memoria usada por la exportación en streaming de Historial según el tamaño de la tabla.
+
+Consume el cuerpo de ``GET /export/historial`` directamente (sin cliente HTTP,
+que acumularía la respuesta) y mide con tracemalloc el pico de memoria
+adicional a la de la tabla ya cargada en el backend en memoria.
+
+Uso: SECRET_KEY=... python -m benchmarks.bench_export [--filas 10000 50000 200000]
+"""
+import argparse
+import asyncio
+import os
+import time
+import tracemalloc
+
+os.environ["DB_BACKEND"] = "fake"
+
+from db.fake_backend import FakeBackend
+from db.repository import db
+from routers.export import export_recurso
+
+
+def _historial(n: int):
+    return [{
+        "id_mascota": i % 3000 + 1, "fecha": f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}", "tipo": "Consulta",
+        "descripcion": "Control general y revisión de vacunas", "veterinario_id": i % 8 + 1, "resultado": "Sano",
+    } for i in range(n)]
+
+
+async def _export(formato: str) -> int:
+    response = await export_recurso("historial", formato)
+    total = 0
+    async for chunk in response.body_iterator:
+        total += len(chunk)
+    return total
+
+
+async def main(sizes, formato: str) -> None:
+    print(f"{'filas':>8}{'bytes exportados':>18}{'pico memoria':>15}{'tiempo':>9}")
+    for n in sizes:
+        backend = FakeBackend()
+        backend.seed("Historial", _historial(n))
+        db.use_backend(backend)
+        tracemalloc.start()
+        start = time.perf_counter()
+        exported = await _export(formato)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{n:>8}{exported:>18}{peak / 1024:>12.0f} KB{elapsed:>8.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, nargs="+", default=[10000, 50000, 200000])
+    parser.add_argument("--formato", choices=("ndjson", "csv"), default="ndjson")
+    args = parser.parse_args()
+    asyncio.run(main(args.filas, args.formato))
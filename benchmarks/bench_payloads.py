@@ -0,0 +1,54 @@
+"""
+Bytes transferidos por las lecturas más consultadas: sin compresión, con gzip,
+con brotli y cuando el cliente revalida con If-None-Match (304).
+
+Uso: SECRET_KEY=... python -m benchmarks.bench_payloads
+"""
+import asyncio
+import os
+import random
+
+os.environ["DB_BACKEND"] = "fake"
+
+import httpx
+
+from app import app
+from core.security import create_access_token
+from db.repository import db
+
+ENDPOINTS = ("/mascotas/?limit=100", "/citas/?limit=1000", "/vacunas/", "/dashboard/")
+
+
+def _seed(backend) -> None:
+    rng = random.Random(1)
+    especies = ["Perro", "Gato", "Ave", "Conejo"]
+    backend.seed("Mascotas", [{
+        "nombre_mascota": f"Mascota {i}", "especie": rng.choice(especies), "raza": f"Raza {rng.randint(1, 40)}",
+        "fecha_nacimiento": f"20{rng.randint(10, 24)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+        "id_dueño": rng.randint(1, 500), "image_url": f"https://storage.example.com/images/mascotas/{i}/foto.jpg",
+    } for i in range(2000)])
+    backend.seed("Citas", [{
+        "id_mascota": rng.randint(1, 2000), "fecha_cita": f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "id_veterinario": rng.randint(1, 8), "hora_cita": f"{rng.randint(8, 17):02d}:{rng.choice(['00', '30'])}",
+    } for _ in range(5000)])
+    backend.seed("Vacunas", [{"nombre": f"Vacuna {i}", "descripcion": "Refuerzo anual"} for i in range(30)])
+
+
+async def main() -> None:
+    _seed(db.backend)
+    token = create_access_token({"sub": "vet@clinica.com", "role": "Veterinario", "nombre": "vet", "id": 1})
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers={"Authorization": f"Bearer {token}"}) as client:
+        print(f"{'endpoint':<24}{'identity':>10}{'gzip':>10}{'br':>10}{'304':>6}")
+        for url in ENDPOINTS:
+            sizes = {}
+            for encoding in ("identity", "gzip", "br"):
+                response = await client.get(url, headers={"Accept-Encoding": encoding})
+                sizes[encoding] = len(response.content) if encoding == "identity" else int(response.headers["content-length"])
+            revalidated = await client.get(url, headers={"If-None-Match": response.headers["etag"]})
+            assert revalidated.status_code == 304
+            print(f"{url:<24}{sizes['identity']:>10}{sizes['gzip']:>10}{sizes['br']:>10}{len(revalidated.content):>6}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+"""
+Throughput de la capa de acceso a datos con una latencia de red simulada.
+
+Compara tres formas de atender N consultas concurrentes:
+
+- bloqueante: la llamada síncrona se ejecuta en el event loop (comportamiento anterior).
+- pool de hilos: ``ThreadPoolBackend``, el camino que usa el backend de Supabase.
+- asíncrono: ``FakeBackend`` esperando con ``asyncio.sleep``.
+
+Uso: python -m benchmarks.bench_repository [--peticiones 200] [--latencia-ms 20]
+"""
+import argparse
+import asyncio
+import time
+
+from db.fake_backend import FakeBackend
+from db.repository import Query, ThreadPoolBackend
+
+
+def _backend(latency_ms: float) -> FakeBackend:
+    backend = FakeBackend(latency_ms=latency_ms)
+    backend.seed("Citas", [{"id_mascota": i % 50, "id_veterinario": i % 5} for i in range(1000)])
+    return backend
+
+
+async def _run(execute, requests: int) -> float:
+    query = Query("Citas", filters=(("id_mascota", "eq", 7),))
+
+    async def handler():
+        return await execute(query)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(handler() for _ in range(requests)))
+    return requests / (time.perf_counter() - start)
+
+
+async def main(requests: int, latency_ms: float, workers: int) -> None:
+    blocking = _backend(latency_ms)
+
+    async def blocking_execute(query):
+        return blocking.execute_sync(query)
+
+    pooled = ThreadPoolBackend(_backend(latency_ms), max_workers=workers)
+    native = _backend(latency_ms)
+
+    print(f"{requests} consultas concurrentes, latencia simulada {latency_ms} ms")
+    for name, execute in (
+        ("bloqueante", blocking_execute),
+        (f"pool de hilos ({workers})", pooled.execute),
+        ("asíncrono", native.execute),
+    ):
+        print(f"  {name:<20} {await _run(execute, requests):10.1f} req/s")
+    pooled.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--peticiones", type=int, default=200)
+    parser.add_argument("--latencia-ms", type=float, default=20)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+    asyncio.run(main(args.peticiones, args.latencia_ms, args.workers))
@@ -0,0 +1,248 @@
+"""
+Benchmark de carga reproducible de la API completa contra el backend en memoria.
+
+Arranca ``app:app`` en el mismo proceso con ``DB_BACKEND=fake``, carga datos con
+volúmenes realistas (miles de clientes y mascotas, cientos de miles de filas de
+Historial) y lanza peticiones concurrentes a los endpoints principales: login,
+dashboard, listados, completar cita y subida de imagen. Para cada escenario
+informa p50/p95/p99 de latencia y peticiones por segundo.
+
+Los resultados se guardan en ``benchmarks/results/<fecha>-<commit>.json``; con
+``--comparar`` se muestran las diferencias frente a un resultado anterior.
+
+Uso:
+    python -m benchmarks.load
+    python -m benchmarks.load --historial 300000 --concurrencia 100 --peticiones 2000
+    python -m benchmarks.load --comparar benchmarks/results/20261018-120000-abc1234.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+
+os.environ["DB_BACKEND"] = "fake"
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-benchmark-secret")
+
+import httpx
+
+from app import app
+from core.security import create_access_token, hash_password
+from core.tasks import tasks
+from db.fake_backend import FakeBackend
+from db.repository import db
+
+RESULTS_DIR = Path(__file__).parent / "results"
+PASSWORD = "benchmark"
+ESPECIES = ["Perro", "Gato", "Ave", "Conejo", "Hámster"]
+RESULTADOS = ["Sano", "En tratamiento", "Requiere control", "Derivado"]
+INDEXES = [
+    ("Clientes", "correo"), ("Funcionario", "correo"), ("Mascotas", "id_dueño"),
+    ("VacunasMascotas", "mascota"), ("Citas", "id_mascota"), ("Citas", "id_veterinario"),
+    ("Historial", "id_mascota"),
+]
+
+
+def seed(backend: FakeBackend, args, rng: random.Random) -> None:
+    password_hash = hash_password(PASSWORD)  # un solo hash: bcrypt es lento a propósito
+    backend.seed("Clientes", [
+        {"nombre_usuario": f"cliente{i}", "correo": f"cliente{i}@correo.com", "contraseña": password_hash}
+        for i in range(args.clientes)
+    ])
+    backend.seed("Funcionario", [
+        {"nombre": f"Vet {i}", "puesto": "Veterinario", "correo": f"vet{i}@clinica.com", "contraseña": password_hash}
+        for i in range(args.veterinarios)
+    ])
+    backend.seed("Mascotas", [{
+        "nombre_mascota": f"Mascota {i}", "especie": rng.choice(ESPECIES), "raza": f"Raza {rng.randint(1, 60)}",
+        "fecha_nacimiento": f"20{rng.randint(10, 25)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "id_dueño": rng.randint(1, args.clientes), "image_url": None,
+    } for i in range(args.mascotas)])
+    backend.seed("Vacunas", [{"nombre": f"Vacuna {i}", "descripcion": "Refuerzo anual"} for i in range(30)])
+    backend.seed("VacunasMascotas", [
+        {"mascota": rng.randint(1, args.mascotas), "vacuna": rng.randint(1, 30)} for _ in range(args.mascotas * 2)
+    ])
+    backend.seed("Citas", [{
+        "id_mascota": rng.randint(1, args.mascotas), "id_veterinario": rng.randint(1, args.veterinarios),
+        "fecha_cita": f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "hora_cita": f"{rng.randint(8, 17):02d}:{rng.choice(['00', '30'])}",
+    } for _ in range(args.citas)])
+    backend.seed("Historial", [{
+        "id_mascota": rng.randint(1, args.mascotas), "veterinario_id": rng.randint(1, args.veterinarios),
+        "fecha": f"20{rng.randint(18, 25)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "tipo": "Consulta", "descripcion": "Control general", "resultado": rng.choice(RESULTADOS),
+    } for _ in range(args.historial)])
+    # Índices equivalentes a los de las claves foráneas en Postgres
+    for table, column in INDEXES:
+        backend.create_index(table, column)
+
+
+def _png() -> bytes:
+    try:
+        from PIL import Image
+    except ImportError:
+        # PNG 1x1 mínimo
+        return bytes.fromhex(
+            "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+            "1f15c4890000000d49444154789c6360000002000100e221bc330000000049454e44ae426082"
+        )
+    buffer = io.BytesIO()
+    Image.new("RGB", (1024, 768), (200, 120, 60)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def scenarios(args, rng: random.Random):
+    """Cada escenario es una función ``(client, i) -> awaitable[httpx.Response]``."""
+    citas_pendientes = list(range(1, args.citas + 1))
+    rng.shuffle(citas_pendientes)
+    image = _png()
+
+    def login(client, i):
+        return client.post("/auth/login/", json={
+            "correo": f"cliente{rng.randrange(args.clientes)}@correo.com", "contraseña": PASSWORD, "role": "cliente",
+        })
+
+    def completar_cita(client, i):
+        id_cita = citas_pendientes.pop()
+        return client.post(f"/citas/{id_cita}/completar", json={
+            "tipo": "Consulta", "motivo": "Control", "resultado": rng.choice(RESULTADOS),
+        })
+
+    def upload(client, i):
+        mascota = rng.randint(1, args.mascotas)
+        return client.post(f"/upload/mascota-image/{mascota}", files={"file": (f"foto{i}.png", image, "image/png")})
+
+    return {
+        "login": login,
+        "dashboard": lambda client, i: client.get("/dashboard/"),
+        "mascotas": lambda client, i: client.get("/mascotas/", params={"limit": 100}),
+        "citas": lambda client, i: client.get("/citas/", params={"limit": 100}),
+        "clientes": lambda client, i: client.get("/clientes/"),
+        "vacunas": lambda client, i: client.get("/vacunas/"),
+        "historial_mascota": lambda client, i: client.get(f"/diagnosticos/historial/{rng.randint(1, args.mascotas)}"),
+        "perfil_mascota": lambda client, i: client.get(f"/mascotas/{rng.randint(1, args.mascotas)}/perfil"),
+        "completar_cita": completar_cita,
+        "upload": upload,
+    }
+
+
+def percentile(sorted_values, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+async def run_scenario(client, request, total: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            response = await request(client, i)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "rps": total / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "sin-git"
+
+
+def print_results(results: dict, baseline: dict = None) -> None:
+    header = f"{'escenario':<20}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errores':>9}"
+    if baseline:
+        header += f"{'Δ req/s':>10}{'Δ p95':>9}"
+    print(header)
+    for name, r in results["scenarios"].items():
+        line = f"{name:<20}{r['rps']:>10.1f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['errors']:>9}"
+        base = (baseline or {}).get("scenarios", {}).get(name)
+        if base:
+            line += f"{(r['rps'] / base['rps'] - 1) * 100:>+9.1f}%{(r['p95_ms'] / base['p95_ms'] - 1) * 100 if base['p95_ms'] else 0:>+8.1f}%"
+        print(line)
+
+
+async def main(args) -> None:
+    rng = random.Random(args.semilla)
+    backend = FakeBackend(latency_ms=args.latencia_ms)
+    started = time.perf_counter()
+    seed(backend, args, rng)
+    db.use_backend(backend)
+    print(f"Datos cargados en {time.perf_counter() - started:.1f}s")
+
+    token = create_access_token({"sub": "vet0@clinica.com", "role": "Veterinario", "nombre": "Vet 0", "id": 1})
+    selected = scenarios(args, rng)
+    if args.escenarios:
+        selected = {name: selected[name] for name in args.escenarios}
+
+    results = {
+        "commit": _git_commit(),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("comparar", "escenarios")},
+        "scenarios": {},
+    }
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", headers={"Authorization": f"Bearer {token}"}, timeout=None,
+        ) as client:
+            for name, request in selected.items():
+                total = min(args.peticiones, args.citas) if name == "completar_cita" else args.peticiones
+                if name in ("login", "upload"):
+                    total = max(1, total // 10)  # bcrypt y el procesado de imágenes son lentos a propósito
+                results["scenarios"][name] = await run_scenario(client, request, total, args.concurrencia)
+                await tasks.join()  # que el trabajo en segundo plano no se mezcle con el escenario siguiente
+                r = results["scenarios"][name]
+                print(f"  {name:<20} {r['rps']:8.1f} req/s  p95 {r['p95_ms']:.2f} ms")
+    finally:
+        await app.router.shutdown()
+
+    baseline = json.loads(Path(args.comparar).read_text()) if args.comparar else None
+    print()
+    print_results(results, baseline)
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    output = RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{results['commit']}.json"
+    output.write_text(json.dumps(results, indent=2, ensure_ascii=False))
+    print(f"\nResultados guardados en {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clientes", type=int, default=5000)
+    parser.add_argument("--veterinarios", type=int, default=20)
+    parser.add_argument("--mascotas", type=int, default=8000)
+    parser.add_argument("--citas", type=int, default=20000)
+    parser.add_argument("--historial", type=int, default=200000)
+    parser.add_argument("--peticiones", type=int, default=1000, help="peticiones por escenario")
+    parser.add_argument("--concurrencia", type=int, default=50)
+    parser.add_argument("--latencia-ms", type=float, default=2, help="latencia simulada por consulta")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--escenarios", nargs="+", help="ejecuta solo estos escenarios")
+    parser.add_argument("--comparar", help="JSON de un resultado anterior")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,156 @@
+"""
+Caché en memoria con TTL por clave y expulsión LRU.
+
+Las lecturas frecuentes y poco cambiantes (dashboard, catálogos) se guardan con
+``cache.get_or_load``; los endpoints de escritura llaman a ``cache.invalidate``
+con el espacio de nombres que afectan. Una clave ``"clientes"`` y todas las que
+empiezan por ``"clientes:"`` pertenecen al mismo espacio de nombres.
+
+Cada worker tiene su propia caché, así que ``invalidate`` solo vacía la del que
+atendió la escritura. Para los demás, ``CacheSync`` consulta cada
+``CACHE_SYNC_INTERVAL_SECONDS`` la tabla ``CacheVersiones``
+(db/sql/cache_versiones.sql), cuyas versiones suben los triggers de cada
+escritura, y vacía los espacios de nombres de ``TABLAS`` que dependen de una
+tabla que cambió. Un cambio tarda como mucho ese intervalo en verse en todos
+los workers (``CACHE_TTL_SECONDS`` si la consulta falla).
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from core.config import settings
+from core.metrics import CallbackMetric, registry
+from db.repository import db
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        # Espacio de nombres -> invalidaciones; una carga que coincide con una no se guarda
+        self._generations: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, *namespaces: str) -> None:
+        for ns in namespaces:
+            self._generations[ns] = self._generations.get(ns, 0) + 1
+        for key in list(self._data):
+            if any(key == ns or key.startswith(ns + ":") for ns in namespaces):
+                del self._data[key]
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: Optional[float] = None) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            namespace = key.split(":", 1)[0]
+            generation = self._generations.get(namespace, 0)
+            value = await loader()
+            # Si se invalidó mientras se cargaba, el valor puede ser anterior a la escritura
+            if self._generations.get(namespace, 0) == generation:
+                self.set(key, value, ttl)
+        return value
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+# Espacio de nombres de ``cache`` -> tablas de las que se leen sus entradas
+TABLAS = {
+    "dashboard": ("Citas", "Historial", "Clientes", "Funcionario", "Mascotas"),
+    "clientes": ("Clientes",),
+    "funcionarios": ("Funcionario",),
+    "mascotas": ("Mascotas",),
+    "vacunas": ("Vacunas",),
+    "catalogo_vacunas": ("Vacunas",),
+}
+
+
+class CacheSync:
+    """Vacía las entradas que otro worker (o cualquier escritura en la base de datos) dejó obsoletas."""
+
+    def __init__(self, cache: TTLCache, tablas: Dict[str, Tuple[str, ...]]):
+        self.cache = cache
+        self.tablas = tablas
+        self._versions: Optional[Dict[str, int]] = None
+
+    async def sync(self) -> None:
+        response = await db.select("CacheVersiones", "tabla, version")
+        versions = {row["tabla"]: row["version"] for row in response.data}
+        if self._versions is None:
+            # Primera consulta: lo cargado antes (p. ej. en el warm-up) no se puede comprobar
+            changed = {tabla for tablas in self.tablas.values() for tabla in tablas}
+        else:
+            changed = {tabla for tabla, version in versions.items() if self._versions.get(tabla) != version}
+        namespaces = [ns for ns, tablas in self.tablas.items() if changed.intersection(tablas)]
+        if namespaces:
+            self.cache.invalidate(*namespaces)
+        self._versions = versions
+
+    async def run_periodically(self, interval: float) -> None:
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                print(f"Error sincronizando la caché: {str(e)}")
+            await asyncio.sleep(interval)
+
+
+cache = TTLCache(settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
+cache_sync = CacheSync(cache, TABLAS)
+
+registry.register(CallbackMetric(
+    "cache_events_total", "Eventos de la caché de lecturas", "counter",
+    lambda: {
+        ("hit",): cache.hits,
+        ("miss",): cache.misses,
+        ("eviction",): cache.evictions,
+        ("expiration",): cache.expirations,
+        ("invalidation",): cache.invalidations,
+    },
+    ("event",),
+))
+registry.register(CallbackMetric("cache_entries", "Entradas en la caché de lecturas", "gauge", lambda: len(cache)))
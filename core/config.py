@@ -10,4 +10,88 @@ class Settings:
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Capa de acceso a datos: "supabase" o "fake" (backend en memoria para pruebas de carga)
+    DB_BACKEND: str = os.getenv("DB_BACKEND", "supabase")
+    DB_MAX_WORKERS: int = int(os.getenv("DB_MAX_WORKERS", "16"))
+    FAKE_DB_LATENCY_MS: float = float(os.getenv("FAKE_DB_LATENCY_MS", "0"))
+    # Lecturas idénticas concurrentes comparten una sola consulta en vuelo (single-flight)
+    DB_COALESCE_READS: bool = os.getenv("DB_COALESCE_READS", "true").lower() in ("1", "true", "yes")
+
+    # Caché de lecturas frecuentes (dashboard, vacunas, funcionarios, clientes)
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+    CACHE_TTL_SECONDS: float = float(os.getenv("CACHE_TTL_SECONDS", "30"))
+    # Cada cuánto mira cada worker si otro escribió en las tablas cacheadas (0 = no se mira; solo el TTL)
+    CACHE_SYNC_INTERVAL_SECONDS: float = float(os.getenv("CACHE_SYNC_INTERVAL_SECONDS", "1"))
+
+    # Paginación de listados
+    PAGE_DEFAULT_LIMIT: int = int(os.getenv("PAGE_DEFAULT_LIMIT", "100"))
+    PAGE_MAX_LIMIT: int = int(os.getenv("PAGE_MAX_LIMIT", "1000"))
+    EXPORT_PAGE_SIZE: int = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+
+    # bcrypt: factor de coste y pool de hilos dedicado (con límite de trabajos en cola)
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    BCRYPT_WORKERS: int = int(os.getenv("BCRYPT_WORKERS", "4"))
+    BCRYPT_MAX_PENDING: int = int(os.getenv("BCRYPT_MAX_PENDING", "64"))
+
+    # Caché de tokens JWT ya verificados (cada entrada vence con el "exp" del token)
+    TOKEN_CACHE_MAX_ENTRIES: int = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+
+    # Subida de imágenes de mascotas
+    UPLOAD_MAX_BYTES: int = int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+    THUMBNAIL_SIZES: list = [int(s) for s in os.getenv("THUMBNAIL_SIZES", "128,512").split(",") if s.strip()]
+    THUMBNAIL_WORKERS: int = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+
+    # Máximo de elementos por petición en los endpoints por lotes
+    BULK_MAX_ITEMS: int = int(os.getenv("BULK_MAX_ITEMS", "1000"))
+    BULK_CHUNK_SIZE: int = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+
+    # Compresión de respuestas (bytes mínimos del cuerpo para comprimir)
+    COMPRESSION_MIN_BYTES: int = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+
+    # Catálogo de vacunas en memoria (segundos entre recargas)
+    VACUNAS_CATALOGO_TTL: float = float(os.getenv("VACUNAS_CATALOGO_TTL", "300"))
+
+    # Próximas dosis de vacunas (/vacunas/pendientes): columnas de fecha de aplicación (VacunasMascotas)
+    # y de intervalo de refuerzo en días (Vacunas), intervalo por defecto, días de aviso y recálculo completo
+    VACUNAS_FECHA_CAMPO: str = os.getenv("VACUNAS_FECHA_CAMPO", "created_at")
+    VACUNAS_INTERVALO_CAMPO: str = os.getenv("VACUNAS_INTERVALO_CAMPO", "intervalo_dias")
+    VACUNAS_INTERVALO_DIAS: int = int(os.getenv("VACUNAS_INTERVALO_DIAS", "365"))
+    VACUNAS_AVISO_DIAS: int = int(os.getenv("VACUNAS_AVISO_DIAS", "30"))
+    VACUNAS_PENDIENTES_INTERVALO: float = float(os.getenv("VACUNAS_PENDIENTES_INTERVALO", "3600"))
+
+    # Agenda: duración de cada cita, horario de atención e índice de disponibilidad
+    CITA_DURACION_MINUTOS: int = int(os.getenv("CITA_DURACION_MINUTOS", "30"))
+    JORNADA_INICIO: str = os.getenv("JORNADA_INICIO", "08:00")
+    JORNADA_FIN: str = os.getenv("JORNADA_FIN", "18:00")
+    DISPONIBILIDAD_MAX_DIAS: int = int(os.getenv("DISPONIBILIDAD_MAX_DIAS", "20000"))
+    # Segundos que un día cargado se da por bueno antes de releerlo (citas creadas por otros workers)
+    DISPONIBILIDAD_TTL_SECONDS: float = float(os.getenv("DISPONIBILIDAD_TTL_SECONDS", "5"))
+
+    # Búsqueda por nombre/correo (/buscar): máximo de resultados por petición
+    BUSQUEDA_MAX_RESULTADOS: int = int(os.getenv("BUSQUEDA_MAX_RESULTADOS", "100"))
+
+    # Cola de tareas en segundo plano (efectos secundarios de las escrituras)
+    TASK_QUEUE_MAX_SIZE: int = int(os.getenv("TASK_QUEUE_MAX_SIZE", "1000"))
+    TASK_QUEUE_WORKERS: int = int(os.getenv("TASK_QUEUE_WORKERS", "4"))
+    TASK_MAX_ATTEMPTS: int = int(os.getenv("TASK_MAX_ATTEMPTS", "5"))
+    TASK_RETRY_BASE_SECONDS: float = float(os.getenv("TASK_RETRY_BASE_SECONDS", "0.5"))
+    TASK_RETRY_MAX_SECONDS: float = float(os.getenv("TASK_RETRY_MAX_SECONDS", "30"))
+    TASK_DEAD_LETTER_PATH: str = os.getenv("TASK_DEAD_LETTER_PATH", "dead_letter.jsonl")
+    TASK_QUEUE_DRAIN_SECONDS: float = float(os.getenv("TASK_QUEUE_DRAIN_SECONDS", "10"))
+
+    # Servidor (run_server.py). En modo "prod": varios procesos, uvloop/httptools si están instalados
+    # y cierre ordenado con SIGTERM (se dejan terminar las peticiones en curso)
+    SERVER_MODE: str = os.getenv("SERVER_MODE", "dev")
+    SERVER_HOST: str = os.getenv("SERVER_HOST", "127.0.0.1")
+    SERVER_PORT: int = int(os.getenv("SERVER_PORT", "8000"))
+    SERVER_WORKERS: int = int(os.getenv("SERVER_WORKERS", str(os.cpu_count() or 1)))
+    SERVER_BACKLOG: int = int(os.getenv("SERVER_BACKLOG", "2048"))
+    SERVER_KEEPALIVE_SECONDS: int = int(os.getenv("SERVER_KEEPALIVE_SECONDS", "75"))
+    SERVER_GRACEFUL_TIMEOUT: int = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+    SERVER_LIMIT_CONCURRENCY: int = int(os.getenv("SERVER_LIMIT_CONCURRENCY", "0"))  # 0 = sin límite
+    SERVER_ACCESS_LOG: bool = os.getenv("SERVER_ACCESS_LOG", "false").lower() in ("1", "true", "yes")
+
+    # Precarga al arrancar (cliente de Supabase, catálogos y dashboard) antes de aceptar tráfico
+    WARMUP_ENABLED: bool = os.getenv("WARMUP_ENABLED", "true").lower() in ("1", "true", "yes")
+
 settings = Settings()
@@ -0,0 +1,64 @@
+"""
+Utilidades para imágenes de mascotas: detección del tipo real del archivo y
+generación de miniaturas WebP en un pool de hilos.
+
+Pillow es opcional: si no está instalado, ``thumbnails_enabled()`` devuelve
+False y las subidas se guardan sin miniaturas.
+"""
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Dict, List, Optional, Union
+
+from core.config import settings
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - depende del entorno
+    Image = None
+
+# Firmas (magic bytes) de los formatos aceptados
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+thumbnail_executor = ThreadPoolExecutor(max_workers=settings.THUMBNAIL_WORKERS, thread_name_prefix="thumbnails")
+
+
+def sniff_image_type(header: bytes) -> Optional[str]:
+    """Devuelve el content-type según los primeros bytes del archivo, o None si no es una imagen aceptada."""
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, content_type in _SIGNATURES:
+        if header.startswith(signature):
+            return content_type
+    return None
+
+
+def thumbnails_enabled() -> bool:
+    return Image is not None and bool(settings.THUMBNAIL_SIZES)
+
+
+def thumbnail_path(file_path: str, size: int) -> str:
+    directory, name = os.path.split(file_path)
+    return f"{directory}/thumbs/{os.path.splitext(name)[0]}_{size}.webp"
+
+
+def make_thumbnails(source: Union[str, IO[bytes]], sizes: List[int]) -> Dict[int, bytes]:
+    """Genera una miniatura WebP por tamaño (lado mayor en píxeles). Se ejecuta en ``thumbnail_executor``."""
+    thumbnails = {}
+    if hasattr(source, "seek"):
+        source.seek(0)
+    with Image.open(source) as original:
+        original.load()
+        image = original.convert("RGBA" if original.mode in ("RGBA", "LA", "P") else "RGB")
+    for size in sizes:
+        copy = image.copy()
+        copy.thumbnail((size, size))
+        buffer = io.BytesIO()
+        copy.save(buffer, format="WEBP", quality=80)
+        thumbnails[size] = buffer.getvalue()
+    return thumbnails
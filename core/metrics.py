@@ -0,0 +1,113 @@
+"""
+Métricas en memoria con salida en formato de texto de Prometheus (``GET /metrics``).
+
+- ``Histogram``: latencias con buckets fijos. ``observe`` es una búsqueda binaria
+  y dos sumas, así que puede quedarse activo en producción.
+- ``CallbackMetric``: contadores o gauges cuyo valor se lee al exportar (por
+  ejemplo, los contadores de la caché).
+
+Cada módulo registra sus métricas en ``registry``. Los valores son por proceso.
+"""
+import bisect
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple, Union
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # etiquetas -> [conteos por bucket (no acumulados), suma, total]
+        self._series: Dict[Labels, list] = {}
+
+    def observe(self, labels: Labels, value: float) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        i = bisect.bisect_left(self.buckets, value)
+        if i < len(self.buckets):
+            series[0][i] += 1
+        series[1] += value
+        series[2] += 1
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        bucket_names = self.labelnames + ("le",)
+        for labels, (counts, total, count) in list(self._series.items()):
+            cumulative = 0
+            for le, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{_format_labels(bucket_names, labels + (le,))} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(bucket_names, labels + ('+Inf',))} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}"
+
+
+class CallbackMetric:
+    """Métrica cuyo valor se calcula al exportar. ``fn`` devuelve un número o ``{etiquetas: valor}``."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        type: str,
+        fn: Callable[[], Union[float, Dict[Labels, float]]],
+        labelnames: Sequence[str] = (),
+    ):
+        self.name = name
+        self.help = help
+        self.type = type
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.type}"
+        values = self.fn()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Registry:
+    def __init__(self):
+        self._collectors: List = []
+
+    def register(self, collector):
+        self._collectors.append(collector)
+        return collector
+
+    def render(self) -> str:
+        return "\n".join(line for collector in self._collectors for line in collector.collect()) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds",
+    "Duración de las peticiones HTTP por ruta y código de estado",
+    ("method", "route", "status"),
+))
+
+db_query_duration = registry.register(Histogram(
+    "db_query_duration_seconds",
+    "Duración de las consultas a Supabase por tabla y operación",
+    ("table", "operation"),
+))
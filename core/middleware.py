@@ -0,0 +1,275 @@
+"""
+Middlewares ASGI para respuestas de lectura.
+
+- ``ETagMiddleware``: calcula un ETag fuerte (hash del cuerpo) para respuestas
+  200 de GET/HEAD y responde 304 sin cuerpo cuando coincide con ``If-None-Match``.
+- ``CompressionMiddleware``: comprime con brotli (si el paquete ``brotli`` está
+  instalado) o gzip los cuerpos de tipo texto/JSON que superan un umbral. Las
+  respuestas en streaming se comprimen por bloques.
+
+- ``MetricsMiddleware``: histograma de latencias por ruta y código de estado.
+
+Las respuestas que llegan en un solo bloque (JSON normal) se procesan completas;
+las que llegan en varios (streaming) nunca se acumulan en memoria.
+"""
+import gzip
+import hashlib
+import time
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from core.metrics import http_request_duration
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None
+
+_COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+_ENCODING_SUFFIXES = ("-br", "-gzip")
+# Clave del mensaje de inicio de un 304: cabeceras y tamaño de la respuesta completa que sustituye,
+# para que CompressionMiddleware sepa si la habría comprimido (el servidor ignora la clave)
+_FULL_RESPONSE = "etag.full_response"
+
+
+def _strip_encoding_suffix(etag: str) -> str:
+    # El ETag de una variante comprimida es '"<hash>-gzip"'; para comparar se usa el de la identidad
+    for suffix in _ENCODING_SUFFIXES:
+        if etag.endswith(suffix + '"'):
+            return etag[:-len(suffix) - 1] + '"'
+    return etag
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if _strip_encoding_suffix(candidate) == etag:
+            return True
+    return False
+
+
+class ETagMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        start_message = None
+        body_parts = []
+        passthrough = False
+
+        async def send_with_etag(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                if message["status"] != 200:
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            more_body = message.get("more_body", False)
+            if more_body and not body_parts:
+                # Respuesta en streaming: se envía tal cual, sin ETag
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+            body_parts.append(message.get("body", b""))
+            if more_body:
+                return
+
+            body = b"".join(body_parts)
+            headers = MutableHeaders(raw=list(start_message["headers"]))
+            etag = headers.get("etag") or '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+            headers["etag"] = etag
+            if if_none_match and _etag_matches(if_none_match, etag):
+                full_response = {"headers": headers.raw, "size": len(body)}
+                headers = MutableHeaders(raw=list(headers.raw))
+                for name in ("content-length", "content-type"):
+                    if name in headers:
+                        del headers[name]
+                await send({
+                    "type": "http.response.start", "status": 304, "headers": headers.raw, _FULL_RESPONSE: full_response,
+                })
+                await send({"type": "http.response.body", "body": b""})
+                return
+            await send({**start_message, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_with_etag)
+
+
+class _Encoder:
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=level)
+        else:
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _choose_encoding(self, scope):
+        accept = Headers(scope=scope).get("accept-encoding", "")
+        accepted = {part.split(";")[0].strip().lower() for part in accept.split(",")}
+        if brotli is not None and "br" in accepted:
+            return "br", self.brotli_quality
+        if "gzip" in accepted:
+            return "gzip", self.gzip_level
+        return None, None
+
+    @staticmethod
+    def _compressible(headers: Headers) -> bool:
+        return "content-encoding" not in headers and headers.get("content-type", "").startswith(_COMPRESSIBLE_TYPES)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding, level = self._choose_encoding(scope)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        encoder = None
+        passthrough = False
+
+        def compressed_headers(length=None):
+            headers = MutableHeaders(raw=list(start_message["headers"]))
+            headers["content-encoding"] = encoding
+            headers.add_vary_header("Accept-Encoding")
+            if "etag" in headers:
+                headers["etag"] = headers["etag"][:-1] + f'-{encoding}"'
+            if length is None or start_message["status"] == 304:
+                if "content-length" in headers:
+                    del headers["content-length"]
+                if start_message["status"] == 304:
+                    del headers["content-encoding"]
+            else:
+                headers["content-length"] = str(length)
+            return headers.raw
+
+        async def send_compressed(message):
+            nonlocal start_message, encoder, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if message["status"] == 304 and "etag" in headers:
+                    # El 304 lleva el mismo ETag que la respuesta que sustituye: el de la variante
+                    # comprimida solo si esa respuesta se habría comprimido
+                    passthrough = True
+                    full_response = message.get(_FULL_RESPONSE)
+                    if full_response is not None and (
+                        full_response["size"] < self.minimum_size
+                        or not self._compressible(Headers(raw=full_response["headers"]))
+                    ):
+                        await send(message)
+                        return
+                    start_message = message
+                    await send({**message, "headers": compressed_headers(length=0)})
+                    return
+                if not self._compressible(headers):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                if not more_body:
+                    # Respuesta completa en un solo bloque
+                    if len(body) < self.minimum_size:
+                        await send(start_message)
+                        await send(message)
+                        return
+                    if encoding == "br":
+                        data = brotli.compress(body, quality=level)
+                    else:
+                        data = gzip.compress(body, compresslevel=level)
+                    await send({**start_message, "headers": compressed_headers(len(data))})
+                    await send({"type": "http.response.body", "body": data})
+                    return
+                encoder = _Encoder(encoding, level)
+                await send({**start_message, "headers": compressed_headers()})
+
+            data = encoder.compress(body)
+            if not more_body:
+                data += encoder.flush()
+            if data or not more_body:
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+class MetricsMiddleware:
+    """Registra la duración de cada petición HTTP por método, ruta (plantilla) y código de estado."""
+
+    def __init__(self, app):
+        self.app = app
+        self._templates = None
+
+    def _route_template(self, scope) -> str:
+        if self._templates is None:
+            # endpoint -> plantilla de la ruta (p. ej. "/citas/{id}"), para no usar la URL concreta como etiqueta
+            self._templates = {}
+            for route in scope["app"].routes:
+                endpoint = getattr(route, "endpoint", None)
+                if endpoint is not None:
+                    self._templates.setdefault(endpoint, route.path)
+        return self._templates.get(scope.get("endpoint"), "sin_ruta")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_request_duration.observe(
+                (scope["method"], self._route_template(scope), str(status)),
+                time.perf_counter() - start,
+            )
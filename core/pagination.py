@@ -0,0 +1,97 @@
+"""
+Paginación por cursor (keyset sobre ``id``) y proyección de columnas para los listados.
+
+Uso en un router::
+
+    @router.get("/")
+    async def get_items(page: Page = Depends()):
+        return await paginate("Tabla", page)
+
+La respuesta es ``{"data": [...], "next_cursor": <id o null>}``; para pedir la
+página siguiente se envía ``?cursor=<next_cursor>``. ``fields=id,nombre`` limita
+las columnas devueltas.
+"""
+import re
+from typing import AsyncIterator, Iterable, List, Optional, Sequence
+
+from fastapi import HTTPException, Query
+
+from core.config import settings
+from db.repository import Filter, db
+
+_COLUMN = re.compile(r"^[A-Za-z_À-ſ][\wÀ-ſ]*$")
+
+
+class Page:
+    def __init__(
+        self,
+        cursor: Optional[int] = Query(None, description="Último id recibido (next_cursor de la página anterior)"),
+        limit: int = Query(settings.PAGE_DEFAULT_LIMIT, ge=1, le=settings.PAGE_MAX_LIMIT),
+        fields: Optional[str] = Query(None, description="Columnas separadas por comas, por ejemplo id,nombre"),
+    ):
+        self.cursor = cursor
+        self.limit = limit
+        self.fields = fields
+        self.requested = [name.strip() for name in fields.split(",") if name.strip()] if fields else []
+        self._check([name for name in self.requested if not _COLUMN.match(name)])
+
+    @staticmethod
+    def _check(invalid: Sequence[str]) -> None:
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Campos no válidos: {', '.join(invalid)}")
+
+    def columns(self, default: str = "*", allowed: Optional[Iterable[str]] = None) -> str:
+        if not self.requested:
+            return default
+        requested = list(self.requested)
+        if allowed is not None:
+            allowed = set(allowed)
+            self._check([name for name in requested if name not in allowed])
+        if "id" not in requested:
+            requested.insert(0, "id")  # necesario para calcular next_cursor
+        return ", ".join(requested)
+
+    def cache_key(self, namespace: str) -> str:
+        return f"{namespace}:{self.cursor}:{self.limit}:{self.fields}"
+
+
+async def paginate(
+    table: str,
+    page: Page,
+    filters: Sequence[Filter] = (),
+    default_columns: str = "*",
+    allowed_fields: Optional[Iterable[str]] = None,
+) -> dict:
+    filters = list(filters)
+    if page.cursor is not None:
+        filters.append(("id", "gt", page.cursor))
+    # Se pide una fila de más para saber si existe una página siguiente
+    response = await db.select(
+        table, page.columns(default_columns, allowed_fields), filters, order="id", limit=page.limit + 1,
+    )
+    rows = response.data
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        next_cursor = rows[-1]["id"]
+    return {"data": rows, "next_cursor": next_cursor}
+
+
+async def iter_pages(
+    table: str,
+    filters: Sequence[Filter] = (),
+    columns: str = "*",
+    page_size: int = settings.PAGE_MAX_LIMIT,
+) -> AsyncIterator[List[dict]]:
+    """Recorre una tabla completa página a página (keyset sobre ``id``) sin acumular filas."""
+    cursor = None
+    while True:
+        page_filters = list(filters)
+        if cursor is not None:
+            page_filters.append(("id", "gt", cursor))
+        rows = (await db.select(table, columns, page_filters, order="id", limit=page_size)).data
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        cursor = rows[-1]["id"]
@@ -0,0 +1,27 @@
+"""
+Respuesta JSON rápida (orjson) usada como clase por defecto de la app.
+
+FastAPI pasa el valor devuelto por ``jsonable_encoder`` antes de serializarlo;
+los listados grandes devuelven ``FastJSONResponse(...)`` directamente para
+evitar ese recorrido, ya que las filas de Supabase son JSON puro.
+"""
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is None:
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
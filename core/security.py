@@ -1,31 +1,100 @@
+import asyncio
+import functools
+import time
 import bcrypt
 import jwt
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from core.config import settings
+from core.cache import TTLCache
+from core.metrics import CallbackMetric, registry
+from models.models import Principal
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 def hash_password(plain_password: str) -> str:
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed_password = bcrypt.hashpw(plain_password.encode('utf-8'), salt)
     return hashed_password.decode('utf-8')
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    # Formato de bcrypt: $2b$<coste>$<salt+hash>
+    try:
+        return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+# bcrypt libera el GIL, así que un pool de hilos basta para sacarlo del event loop.
+_bcrypt_executor = ThreadPoolExecutor(max_workers=settings.BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+_bcrypt_pending = 0
+
+async def _run_bcrypt(fn, *args):
+    global _bcrypt_pending
+    if _bcrypt_pending >= settings.BCRYPT_MAX_PENDING:
+        raise HTTPException(
+            status_code=503,
+            detail="Servidor ocupado, intente de nuevo",
+            headers={"Retry-After": "1"},
+        )
+    _bcrypt_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_bcrypt_executor, functools.partial(fn, *args))
+    finally:
+        _bcrypt_pending -= 1
+
+registry.register(CallbackMetric(
+    "bcrypt_pending_jobs", "Trabajos de bcrypt en curso o en cola", "gauge", lambda: _bcrypt_pending,
+))
+
+async def hash_password_async(plain_password: str) -> str:
+    return await _run_bcrypt(hash_password, plain_password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_bcrypt(verify_password, plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
-def verify_token(token: str = Depends(oauth2_scheme)):
+# token -> (payload, Principal). Solo se guardan tokens con firma válida y la
+# entrada vence cuando vence el token, así que un token expirado vuelve a
+# pasar por jwt.decode y recibe el 401 correspondiente.
+# Las dependencias son async para que la caché (un OrderedDict sin lock) solo se
+# use desde el event loop; las dependencias sync se ejecutan en el pool de hilos.
+_token_cache = TTLCache(settings.TOKEN_CACHE_MAX_ENTRIES, ttl=0)
+
+def _decode_token(token: str):
+    cached = _token_cache.get(token)
+    if cached is not None:
+        return cached
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload  # Devuelve el payload completo, incluyendo el rol
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expirado")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Token inválido")
+    try:
+        principal = Principal(**payload)
+    except ValueError:
+        principal = None  # token válido pero sin los campos de Principal
+    entry = (payload, principal)
+    if "exp" in payload:
+        _token_cache.set(token, entry, ttl=payload["exp"] - time.time())
+    return entry
+
+async def verify_token(token: str = Depends(oauth2_scheme)):
+    return _decode_token(token)[0]  # Devuelve el payload completo, incluyendo el rol
+
+async def get_principal(token: str = Depends(oauth2_scheme)) -> Principal:
+    principal = _decode_token(token)[1]
+    if principal is None:
+        raise HTTPException(status_code=401, detail="Token inválido")
+    return principal
@@ -0,0 +1,255 @@
+"""
+Cola de tareas en segundo plano para los efectos secundarios de las escrituras.
+
+Los endpoints hacen la escritura imprescindible, encolan el resto con
+``await tasks.submit("nombre", funcion, *args)`` y responden sin esperarlo.
+
+- La cola está acotada (``TASK_QUEUE_MAX_SIZE``): si se llena, ``submit`` espera
+  a que haya sitio, lo que frena a los clientes en vez de acumular memoria.
+- ``TASK_QUEUE_WORKERS`` tareas se ejecutan a la vez.
+- Una tarea que falla se reintenta con espera exponencial (con jitter) hasta
+  ``TASK_MAX_ATTEMPTS`` intentos; después se añade al registro de fallos
+  (``TASK_DEAD_LETTER_PATH``, una línea JSON por tarea) para revisarla o
+  relanzarla a mano.
+- ``start``/``stop`` se llaman desde el startup/shutdown de la app. Al parar se
+  esperan las tareas pendientes hasta ``TASK_QUEUE_DRAIN_SECONDS``; las que no
+  llegan a ejecutarse también van al registro de fallos.
+
+Fuera de la app (scripts, benchmarks) la cola no está arrancada y ``submit``
+ejecuta la tarea en el momento, con los mismos reintentos. Lo mismo ocurre si
+una tarea encola otra con la cola llena, para que los workers no se bloqueen
+esperándose entre sí.
+
+La cola es por proceso y vive en memoria: una caída del proceso pierde las
+tareas encoladas. Sirve para trabajo que se puede recalcular (cachés,
+agregados, miniaturas), no como sustituto de una cola persistente.
+"""
+import asyncio
+import contextvars
+import itertools
+import json
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from core.config import settings
+from core.metrics import CallbackMetric, Histogram, registry
+
+task_duration = registry.register(Histogram(
+    "task_duration_seconds", "Duración de cada intento de las tareas en segundo plano", ("task",),
+))
+task_wait = registry.register(Histogram(
+    "task_queue_wait_seconds", "Tiempo que pasa una tarea en la cola antes de empezar", ("task",),
+))
+
+
+_in_worker = contextvars.ContextVar("in_task_worker", default=False)
+
+
+@dataclass
+class Job:
+    id: int
+    name: str
+    fn: Callable[..., Awaitable[Any]]
+    args: tuple
+    kwargs: dict
+    max_attempts: int
+    attempts: int = 0
+    enqueued_at: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+
+def _json_default(value):
+    if isinstance(value, (bytes, bytearray)):
+        return f"<{len(value)} bytes>"
+    return str(value)
+
+
+class TaskQueue:
+    def __init__(
+        self,
+        maxsize: int,
+        workers: int,
+        max_attempts: int,
+        retry_base: float,
+        retry_max: float,
+        dead_letter_path: str,
+    ):
+        self.maxsize = maxsize
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.dead_letter_path = dead_letter_path
+        self.running = False
+        self.active = 0
+        self.counts: Dict[Tuple[str, str], int] = {}
+        self._ids = itertools.count(1)
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._retries: Dict[asyncio.Task, Job] = {}
+        self._in_progress: Dict[int, Job] = {}
+        self._pending: "OrderedDict[int, float]" = OrderedDict()  # id -> momento en que se encoló
+
+    # --- Ciclo de vida -----------------------------------------------------
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(self.maxsize)
+        self._workers = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+        self.running = True
+
+    async def stop(self, timeout: float) -> None:
+        """Deja de aceptar tareas, espera las pendientes y guarda en el registro de fallos las que no terminan."""
+        if not self.running:
+            return
+        self.running = False
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        unfinished = list(self._in_progress.values()) + list(self._retries.values())
+        for retry in list(self._retries):
+            retry.cancel()
+        while not self._queue.empty():
+            unfinished.append(self._queue.get_nowait())
+        for job in unfinished:
+            self._count(job.name, "dead")
+            await self._dead_letter(job, "no ejecutada antes del apagado")
+        self._retries.clear()
+        self._in_progress.clear()
+        self._pending.clear()
+
+    async def join(self) -> None:
+        """Espera a que terminen las tareas encoladas y los reintentos pendientes."""
+        while self.running:
+            await self._queue.join()
+            if not self._retries:
+                return
+            await asyncio.wait(list(self._retries))
+
+    # --- Encolado y ejecución ------------------------------------------------
+
+    async def submit(self, name: str, fn: Callable[..., Awaitable[Any]], *args, max_attempts: Optional[int] = None, **kwargs) -> None:
+        job = Job(next(self._ids), name, fn, args, kwargs, max_attempts or self.max_attempts)
+        if not self.running or (_in_worker.get() and self._queue.full()):
+            await self._run_inline(job)
+            return
+        await self._enqueue(job)
+
+    async def _enqueue(self, job: Job) -> None:
+        job.enqueued_at = time.monotonic()
+        self._pending[job.id] = job.enqueued_at
+        await self._queue.put(job)
+
+    async def _worker(self) -> None:
+        _in_worker.set(True)
+        while True:
+            job = await self._queue.get()
+            self._pending.pop(job.id, None)
+            task_wait.observe((job.name,), time.monotonic() - job.enqueued_at)
+            self._in_progress[job.id] = job
+            try:
+                delay = await self._attempt(job)
+                del self._in_progress[job.id]
+                if delay is not None:
+                    retry = asyncio.ensure_future(self._retry_later(job, delay))
+                    self._retries[retry] = job
+                    retry.add_done_callback(lambda task: self._retries.pop(task, None))
+            finally:
+                self._queue.task_done()
+
+    async def _retry_later(self, job: Job, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await self._enqueue(job)
+
+    async def _run_inline(self, job: Job) -> None:
+        while True:
+            delay = await self._attempt(job)
+            if delay is None:
+                return
+            await asyncio.sleep(delay)
+
+    async def _attempt(self, job: Job) -> Optional[float]:
+        """Ejecuta un intento. Devuelve la espera antes del siguiente, o None si ya no hay más."""
+        job.attempts += 1
+        self.active += 1
+        start = time.perf_counter()
+        try:
+            await job.fn(*job.args, **job.kwargs)
+            self._count(job.name, "ok")
+            return None
+        except Exception as e:
+            job.errors.append(f"{type(e).__name__}: {e}")
+            if job.attempts >= job.max_attempts:
+                self._count(job.name, "dead")
+                print(f"Tarea {job.name} fallida tras {job.attempts} intentos: {str(e)}")
+                await self._dead_letter(job, str(e))
+                return None
+            self._count(job.name, "retry")
+            backoff = min(self.retry_max, self.retry_base * 2 ** (job.attempts - 1))
+            return backoff * random.uniform(0.5, 1.0)
+        finally:
+            self.active -= 1
+            task_duration.observe((job.name,), time.perf_counter() - start)
+
+    def _count(self, name: str, result: str) -> None:
+        self.counts[(name, result)] = self.counts.get((name, result), 0) + 1
+
+    async def _dead_letter(self, job: Job, reason: str) -> None:
+        line = json.dumps({
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "tarea": job.name,
+            "args": job.args,
+            "kwargs": job.kwargs,
+            "intentos": job.attempts,
+            "motivo": reason,
+            "errores": job.errors,
+        }, ensure_ascii=False, default=_json_default)
+        try:
+            await asyncio.to_thread(self._append, line)
+        except Exception as e:
+            print(f"No se pudo escribir en {self.dead_letter_path}: {str(e)} ({line})")
+
+    def _append(self, line: str) -> None:
+        with open(self.dead_letter_path, "a", encoding="utf-8") as fh:
+            fh.write(line + "\n")
+
+    # --- Observabilidad -------------------------------------------------------
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def lag(self) -> float:
+        """Segundos que lleva esperando la tarea más antigua de la cola."""
+        if not self._pending:
+            return 0.0
+        return time.monotonic() - next(iter(self._pending.values()))
+
+
+tasks = TaskQueue(
+    maxsize=settings.TASK_QUEUE_MAX_SIZE,
+    workers=settings.TASK_QUEUE_WORKERS,
+    max_attempts=settings.TASK_MAX_ATTEMPTS,
+    retry_base=settings.TASK_RETRY_BASE_SECONDS,
+    retry_max=settings.TASK_RETRY_MAX_SECONDS,
+    dead_letter_path=settings.TASK_DEAD_LETTER_PATH,
+)
+
+registry.register(CallbackMetric("task_queue_depth", "Tareas esperando en la cola", "gauge", tasks.depth))
+registry.register(CallbackMetric(
+    "task_queue_lag_seconds", "Antigüedad de la tarea más vieja en la cola", "gauge", tasks.lag,
+))
+registry.register(CallbackMetric("task_queue_active", "Tareas ejecutándose", "gauge", lambda: tasks.active))
+registry.register(CallbackMetric(
+    "task_queue_retrying", "Tareas esperando un reintento", "gauge", lambda: len(tasks._retries),
+))
+registry.register(CallbackMetric(
+    "task_jobs_total", "Intentos de tareas por resultado (ok, retry, dead)", "counter",
+    lambda: dict(tasks.counts), ("task", "result"),
+))
@@ -0,0 +1,477 @@
+"""
+Backend en memoria que imita la API de tablas, RPC y storage de Supabase.
+
+Se activa con ``DB_BACKEND=fake`` o con ``db.use_backend(FakeBackend())``. Sirve
+para pruebas de carga locales sin red ni base de datos. Las funciones y los
+triggers de db/sql/ tienen aquí su equivalente en Python; los que rechazan una
+escritura lanzan el mismo ``APIError`` que postgrest, con su SQLSTATE. ``latency_ms`` simula el
+tiempo de ida y vuelta: ``execute`` espera de forma asíncrona y ``execute_sync``
+bloquea el hilo, como lo haría el cliente síncrono.
+"""
+import asyncio
+import bisect
+import itertools
+import re
+import threading
+import time
+from datetime import datetime, time as dtime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from postgrest.exceptions import APIError
+
+from core.config import settings
+from db.fake_search import SearchIndex
+from db.repository import Query, Result
+
+
+def _like(pattern: str, case_insensitive: bool) -> "re.Pattern":
+    regex = "^" + ".*".join(re.escape(part) for part in str(pattern).split("%")) + "$"
+    return re.compile(regex, re.IGNORECASE if case_insensitive else 0)
+
+
+def _matches(row: dict, column: str, op: str, value: Any) -> bool:
+    actual = row.get(column)
+    if op == "eq":
+        return actual == value
+    if op == "neq":
+        return actual != value
+    if op == "in":
+        return actual in value
+    if op == "is":
+        return actual is None if value in (None, "null") else actual == value
+    if op == "not_is":
+        return actual is not None if value in (None, "null") else actual != value
+    if op in ("like", "ilike"):
+        return actual is not None and bool(_like(value, op == "ilike").match(str(actual)))
+    if actual is None:
+        return False
+    if op == "gt":
+        return actual > value
+    if op == "gte":
+        return actual >= value
+    if op == "lt":
+        return actual < value
+    if op == "lte":
+        return actual <= value
+    raise ValueError(f"Operador no soportado: {op}")
+
+
+def _row_id(row: dict) -> Any:
+    return row["id"]
+
+
+def _project(row: dict, columns: str) -> dict:
+    if columns.strip() == "*":
+        return dict(row)
+    return {name: row.get(name) for name in (c.strip() for c in columns.split(",")) if name}
+
+
+# --- Equivalentes en Python de las funciones de db/sql/ -------------------
+
+def _citas_por_veterinario(backend: "FakeBackend", params: dict) -> List[dict]:
+    totales: Dict[Any, int] = {}
+    for cita in backend.tables.get("Citas", []):
+        vet_id = cita.get("id_veterinario")
+        if vet_id is not None:
+            totales[vet_id] = totales.get(vet_id, 0) + 1
+    return [{"id_veterinario": vet_id, "total": total} for vet_id, total in totales.items()]
+
+
+def _completar_citas(backend: "FakeBackend", params: dict) -> List[dict]:
+    resultados = []
+    for item in params["p_citas"]:
+        cita = next(backend._iter_rows(Query("Citas", filters=(("id", "eq", item["id_cita"]),))), None)
+        if cita is None:
+            resultados.append({"id_cita": item["id_cita"], "ok": False, "error": "Cita no encontrada"})
+            continue
+        backend._delete_rows("Citas", [cita])
+        historial = backend._insert("Historial", [{
+            "id_mascota": cita["id_mascota"],
+            "fecha": cita["fecha_cita"],
+            "tipo": item["tipo"],
+            "descripcion": item["motivo"],
+            "veterinario_id": cita["id_veterinario"],
+            "resultado": item["resultado"],
+        }])[0]
+        resultados.append({"id_cita": cita["id"], "ok": True, "cita": dict(cita), "historial": historial})
+    return resultados
+
+
+def _historial_resumen_sumar(backend: "FakeBackend", historial: dict, cantidad: int, especie: Any = None) -> None:
+    # Sin ``especie``, la de la mascota de la visita
+    if not historial.get("fecha"):
+        return
+    if especie is None:
+        mascota = next(backend._iter_rows(Query("Mascotas", filters=(("id", "eq", historial.get("id_mascota")),))), None)
+        especie = (mascota or {}).get("especie")
+    clave = (
+        str(historial["fecha"])[:10],
+        historial.get("veterinario_id"),
+        especie or "Desconocida",
+        historial.get("resultado") or "Sin resultado",
+    )
+    fila = backend._historial_resumen.get(clave)
+    if fila is None:
+        dia, veterinario_id, especie, resultado = clave
+        nueva = backend._insert("HistorialResumen", [{
+            "dia": dia, "veterinario_id": veterinario_id, "especie": especie, "resultado": resultado, "total": 0,
+        }])[0]
+        # _insert devuelve una copia: se guarda la fila almacenada para sumarle después
+        fila = next(backend._iter_rows(Query("HistorialResumen", filters=(("id", "eq", nueva["id"]),))))
+        backend._historial_resumen[clave] = fila
+    fila["total"] += cantidad
+
+
+def _historial_resumen(backend: "FakeBackend", table: str, old: Optional[dict], new: Optional[dict]) -> None:
+    # Trigger historial_resumen de db/sql/historial_resumen.sql
+    if old is not None:
+        _historial_resumen_sumar(backend, old, -1)
+    if new is not None:
+        _historial_resumen_sumar(backend, new, 1)
+
+
+def _historial_resumen_mover(backend: "FakeBackend", mascota: Any, antes: Optional[str], despues: Optional[str]) -> None:
+    antes, despues = antes or "Desconocida", despues or "Desconocida"
+    if antes == despues:
+        return
+    for historial in list(backend._iter_rows(Query("Historial", filters=(("id_mascota", "eq", mascota),)))):
+        _historial_resumen_sumar(backend, historial, -1, antes)
+        _historial_resumen_sumar(backend, historial, 1, despues)
+
+
+def _historial_resumen_especie(backend: "FakeBackend", table: str, old: Optional[dict], new: Optional[dict]) -> None:
+    # Trigger historial_resumen_especie de db/sql/historial_resumen.sql
+    if old is None:
+        return
+    if new is None:
+        _historial_resumen_mover(backend, old["id"], old.get("especie"), None)
+    elif old["id"] == new["id"]:
+        _historial_resumen_mover(backend, new["id"], old.get("especie"), new.get("especie"))
+    else:
+        _historial_resumen_mover(backend, old["id"], old.get("especie"), None)
+        _historial_resumen_mover(backend, new["id"], None, new.get("especie"))
+
+
+def _resumen_historial(backend: "FakeBackend", params: dict) -> dict:
+    desde, hasta = params.get("p_desde"), params.get("p_hasta")
+    resultado = {"total": 0, "por_mes": {}, "por_veterinario": {}, "por_especie": {}, "por_resultado": {}}
+    for fila in backend.tables.get("HistorialResumen", []):
+        if not fila["total"] or (desde and fila["dia"] < desde) or (hasta and fila["dia"] > hasta):
+            continue
+        resultado["total"] += fila["total"]
+        for campo, clave in (
+            ("por_mes", fila["dia"][:7]),
+            ("por_veterinario", "null" if fila["veterinario_id"] is None else str(fila["veterinario_id"])),
+            ("por_especie", fila["especie"]),
+            ("por_resultado", fila["resultado"]),
+        ):
+            resultado[campo][clave] = resultado[campo].get(clave, 0) + fila["total"]
+    resultado["por_mes"] = dict(sorted(resultado["por_mes"].items()))
+    return resultado
+
+
+def _minutos(hora: Any) -> int:
+    parsed = dtime.fromisoformat(str(hora))
+    return parsed.hour * 60 + parsed.minute
+
+
+def _citas_sin_solapamiento(backend: "FakeBackend", table: str, old: Optional[dict], new: dict) -> None:
+    # Trigger citas_sin_solapamiento de db/sql/citas_sin_solapamiento.sql
+    if new.get("id_veterinario") is None or new.get("fecha_cita") is None or new.get("hora_cita") is None:
+        return
+    inicio = _minutos(new["hora_cita"])
+    filtros = (("id_veterinario", "eq", new["id_veterinario"]), ("fecha_cita", "eq", new["fecha_cita"]))
+    choques = sorted(
+        _minutos(cita["hora_cita"]) for cita in backend._iter_rows(Query("Citas", filters=filtros))
+        if cita["id"] != new.get("id") and abs(_minutos(cita["hora_cita"]) - inicio) < settings.CITA_DURACION_MINUTOS
+    )
+    if choques:
+        raise APIError({
+            "code": "23P01",
+            "message": f"El veterinario ya tiene una cita a las {choques[0] // 60:02d}:{choques[0] % 60:02d} ese día",
+        })
+
+
+def _busqueda_indexar(backend: "FakeBackend", table: str, old: Optional[dict], new: Optional[dict]) -> None:
+    # Trigger busqueda_indexar de db/sql/busqueda.sql sobre Mascotas, Clientes y Funcionario
+    if new is None:
+        backend._busqueda.remove(table, old)
+    elif old is None or any(old.get(c) != new.get(c) for c in backend._busqueda.columns(table)):
+        backend._busqueda.add(table, new)
+
+
+def _mascotas(backend: "FakeBackend", table: str, old: Optional[dict], new: Optional[dict]) -> None:
+    _busqueda_indexar(backend, table, old, new)
+    _historial_resumen_especie(backend, table, old, new)
+
+
+def _vacunas_pendientes_reemplazar(backend: "FakeBackend", params: dict) -> None:
+    table = "VacunasPendientes"
+    calculado = params.get("p_calculado")
+    ahora = datetime.now(timezone.utc).isoformat()
+    # "VacunasPendientesMascotas": las refrescadas después de empezar un recálculo completo no se tocan,
+    # aunque el refresco las dejara sin filas
+    existentes = {row["id"] for row in backend._iter_rows(Query("Mascotas", filters=(("id", "in", params["p_mascotas"]),)))}
+    marcas = backend._vacunas_pendientes_mascotas
+    mascotas = {m for m in existentes if not calculado or marcas.get(m, "") <= calculado}
+    marcas.update(dict.fromkeys(mascotas, ahora))
+    nuevas = {fila["id"]: {**fila, "actualizado": ahora} for fila in params["p_filas"] if fila["mascota"] in mascotas}
+    # Se reconstruye la tabla de una vez: insertar fila a fila en mitad de la lista ordenada es cuadrático
+    conservadas = [fila for fila in backend.tables.get(table, []) if fila["id"] not in nuevas and fila["mascota"] not in mascotas]
+    backend._replace_rows(table, conservadas + list(nuevas.values()))
+
+
+def _tarea_periodica_reservar(backend: "FakeBackend", params: dict) -> Optional[str]:
+    ahora = datetime.now(timezone.utc)
+    ultima = backend._tareas_periodicas.get(params["p_nombre"])
+    if ultima is not None and (ahora - ultima).total_seconds() < params["p_intervalo"]:
+        return None
+    backend._tareas_periodicas[params["p_nombre"]] = ahora
+    return ahora.isoformat()
+
+
+def _buscar(backend: "FakeBackend", params: dict) -> List[dict]:
+    return backend._busqueda.search(params["p_q"], params.get("p_limit") or 20, params.get("p_tipos"))
+
+
+DEFAULT_RPCS: Dict[str, Callable[["FakeBackend", dict], Any]] = {
+    "citas_por_veterinario": _citas_por_veterinario,
+    "completar_citas": _completar_citas,
+    "resumen_historial": _resumen_historial,
+    "buscar": _buscar,
+    "vacunas_pendientes_reemplazar": _vacunas_pendientes_reemplazar,
+    "tarea_periodica_reservar": _tarea_periodica_reservar,
+}
+
+# tabla -> fn(backend, tabla, fila anterior o None, fila nueva), antes de cada inserción o cambio; puede rechazarlo
+DEFAULT_CHECKS: Dict[str, Callable[["FakeBackend", str, Optional[dict], dict], None]] = {
+    "Citas": _citas_sin_solapamiento,
+}
+
+# tabla -> fn(backend, tabla, fila anterior o None, fila nueva o None), tras cada inserción, cambio o borrado
+DEFAULT_TRIGGERS: Dict[str, Callable[["FakeBackend", str, Optional[dict], Optional[dict]], None]] = {
+    "Historial": _historial_resumen,
+    "Mascotas": _mascotas,
+    "Clientes": _busqueda_indexar,
+    "Funcionario": _busqueda_indexar,
+}
+
+
+class FakeBackend:
+    def __init__(self, latency_ms: float = 0):
+        self.latency = latency_ms / 1000
+        self.tables: Dict[str, List[dict]] = {}
+        self.storage: Dict[str, bytes] = {}
+        self.rpcs: Dict[str, Callable[["FakeBackend", dict], Any]] = dict(DEFAULT_RPCS)
+        self.checks = dict(DEFAULT_CHECKS)
+        self.triggers = dict(DEFAULT_TRIGGERS)
+        self._historial_resumen: Dict[tuple, dict] = {}  # clave única de "HistorialResumen" -> fila
+        self._busqueda = SearchIndex()
+        self._vacunas_pendientes_mascotas: Dict[Any, str] = {}  # "VacunasPendientesMascotas": mascota -> actualizado
+        self._tareas_periodicas: Dict[str, datetime] = {}  # "TareasPeriodicas": nombre -> última ejecución
+        self._next_id: Dict[str, int] = {}
+        # tabla -> columna -> valor -> filas ordenadas por id (índices secundarios para filtros ``eq``)
+        self._indexes: Dict[str, Dict[str, Dict[Any, List[dict]]]] = {}
+        self._lock = threading.RLock()
+
+    # --- Datos -----------------------------------------------------------
+
+    def seed(self, table: str, rows: List[dict]) -> List[dict]:
+        """
+        Inserta filas sin simular latencia ni pasar las comprobaciones de ``checks`` (datos de
+        prueba que pueden solaparse); asigna ``id`` a las que no lo traen.
+        """
+        with self._lock:
+            return self._insert(table, rows, check=False)
+
+    def register_rpc(self, name: str, fn: Callable[["FakeBackend", dict], Any]) -> None:
+        self.rpcs[name] = fn
+
+    def create_index(self, table: str, column: str) -> None:
+        """Crea un índice para los filtros ``eq`` sobre ``column``, como un índice B-tree de Postgres."""
+        with self._lock:
+            index: Dict[Any, List[dict]] = {}
+            for row in self.tables.get(table, []):
+                index.setdefault(row.get(column), []).append(row)
+            self._indexes.setdefault(table, {})[column] = index
+
+    def _index_add(self, table: str, row: dict, columns: Optional[Iterable[str]] = None) -> None:
+        for column, index in self._indexes.get(table, {}).items():
+            if columns is not None and column not in columns:
+                continue
+            bucket = index.setdefault(row.get(column), [])
+            if bucket and bucket[-1]["id"] > row["id"]:
+                bucket.insert(bisect.bisect_right(bucket, row["id"], key=_row_id), row)
+            else:
+                bucket.append(row)
+
+    def _index_remove(self, table: str, row: dict, columns: Optional[Iterable[str]] = None) -> None:
+        for column, index in self._indexes.get(table, {}).items():
+            if columns is not None and column not in columns:
+                continue
+            bucket = index.get(row.get(column), [])
+            i = bisect.bisect_left(bucket, row["id"], key=_row_id)
+            while i < len(bucket) and bucket[i]["id"] == row["id"]:
+                if bucket[i] is row:
+                    del bucket[i]
+                    break
+                i += 1
+
+    def _insert(self, table: str, rows: List[dict], check: bool = True) -> List[dict]:
+        # Las tablas se mantienen ordenadas por id, como un índice de clave primaria
+        stored = self.tables.setdefault(table, [])
+        inserted = []
+        try:
+            for row in rows:
+                row = dict(row)
+                if row.get("id") is None:
+                    row["id"] = self._next_id.get(table, 1)
+                if check:
+                    self._check(table, None, row)
+                self._next_id[table] = max(self._next_id.get(table, 1), row["id"] + 1)
+                if stored and stored[-1]["id"] > row["id"]:
+                    stored.insert(bisect.bisect_right(stored, row["id"], key=_row_id), row)
+                else:
+                    stored.append(row)
+                self._index_add(table, row)
+                self._trigger(table, None, row)
+                inserted.append(row)
+        except Exception:
+            # Una sentencia que falla no deja ninguna de sus filas, como en Postgres
+            self._delete_rows(table, inserted)
+            raise
+        return [dict(row) for row in inserted]
+
+    def _check(self, table: str, old: Optional[dict], new: dict) -> None:
+        check = self.checks.get(table)
+        if check is not None:
+            check(self, table, old, new)
+
+    def _trigger(self, table: str, old: Optional[dict], new: Optional[dict]) -> None:
+        trigger = self.triggers.get(table)
+        if trigger is not None:
+            trigger(self, table, old, new)
+
+    def _replace_rows(self, table: str, rows: List[dict]) -> None:
+        self.tables[table] = sorted(rows, key=_row_id)
+        if rows:
+            self._next_id[table] = max(self._next_id.get(table, 1), self.tables[table][-1]["id"] + 1)
+        for column in list(self._indexes.get(table, {})):
+            self.create_index(table, column)
+
+    def _update_rows(self, table: str, rows: List[dict], values: dict) -> None:
+        indexed = [column for column in self._indexes.get(table, {}) if column in values]
+        for row in rows:
+            self._check(table, row, {**row, **values})
+        for row in rows:
+            old = dict(row)
+            self._index_remove(table, row, indexed)
+            row.update(values)
+            self._index_add(table, row, indexed)
+            self._trigger(table, old, row)
+
+    def _delete_rows(self, table: str, rows: List[dict]) -> None:
+        ids = {id(row) for row in rows}
+        self.tables[table] = [r for r in self.tables.get(table, []) if id(r) not in ids]
+        for row in rows:
+            self._index_remove(table, row)
+            self._trigger(table, row, None)
+
+    def _candidates(self, query: Query) -> List[dict]:
+        # Filas a recorrer: todas, o solo las que devuelve la clave primaria o un índice
+        rows = self.tables.get(query.table, [])
+        indexes = self._indexes.get(query.table, {})
+        for column, op, value in query.filters:
+            if op != "eq":
+                continue
+            if column == "id":
+                i = bisect.bisect_left(rows, value, key=_row_id)
+                return rows[i:i + 1] if i < len(rows) and rows[i]["id"] == value else []
+            if column in indexes:
+                return indexes[column].get(value, [])
+        return rows
+
+    def _iter_rows(self, query: Query) -> Iterator[dict]:
+        rows = self._candidates(query)
+        start = 0
+        for column, op, value in query.filters:
+            if column == "id" and op in ("gt", "gte"):
+                bisect_fn = bisect.bisect_right if op == "gt" else bisect.bisect_left
+                start = max(start, bisect_fn(rows, value, key=_row_id))
+        for index in range(start, len(rows)):
+            row = rows[index]
+            if all(_matches(row, column, op, value) for column, op, value in query.filters):
+                yield row
+
+    def _apply(self, query: Query) -> Result:
+        with self._lock:
+            if query.op == "rpc":
+                if query.table not in self.rpcs:
+                    raise ValueError(f"Función RPC no registrada: {query.table}")
+                return Result(self.rpcs[query.table](self, query.values or {}))
+
+            if query.op == "insert":
+                values = query.values if isinstance(query.values, list) else [query.values]
+                return Result(self._insert(query.table, values))
+
+            if query.op == "update":
+                rows = list(self._iter_rows(query))
+                self._update_rows(query.table, rows, query.values)
+                return Result([dict(row) for row in rows])
+            if query.op == "delete":
+                rows = list(self._iter_rows(query))
+                self._delete_rows(query.table, rows)
+                return Result([dict(row) for row in rows])
+            if query.op != "select":
+                raise ValueError(f"Operación no soportada: {query.op}")
+
+            if query.head:
+                return Result([], sum(1 for _ in self._iter_rows(query)) if query.count else None)
+            rows: Iterable[dict] = self._iter_rows(query)
+            total = None
+            if query.count:
+                rows = list(rows)
+                total = len(rows)
+            if query.order == "id":
+                if query.desc:
+                    rows = reversed(list(rows))
+            elif query.order:
+                rows = sorted(rows, key=lambda r: (r.get(query.order) is None, r.get(query.order)), reverse=query.desc)
+            if query.limit is not None:
+                rows = itertools.islice(rows, query.limit)
+            return Result([_project(row, query.columns) for row in rows], total)
+
+    # --- Interfaz de backend ------------------------------------------------
+
+    async def execute(self, query: Query) -> Result:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._apply(query)
+
+    def execute_sync(self, query: Query) -> Result:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._apply(query)
+
+    def _store(self, bucket: str, path: str, file: Any) -> None:
+        if isinstance(file, (bytes, bytearray)):
+            data = bytes(file)
+        elif hasattr(file, "read"):
+            data = file.read()
+        else:
+            with open(file, "rb") as fh:
+                data = fh.read()
+        self.storage[f"{bucket}/{path}"] = data
+
+    def upload_sync(self, bucket: str, path: str, file: Any, content_type: Optional[str] = None) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        self._store(bucket, path, file)
+
+    async def upload(self, bucket: str, path: str, file: Any, content_type: Optional[str] = None) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self._store(bucket, path, file)
+
+    def public_url(self, bucket: str, path: str) -> str:
+        return f"memory://{bucket}/{path}"
@@ -0,0 +1,156 @@
+"""
+Equivalente en memoria de la búsqueda de db/sql/busqueda.sql, para el ``FakeBackend``.
+
+Hace el papel de las tablas "BusquedaDocumentos" y "BusquedaTerminos": los
+triggers del backend en memoria lo actualizan en cada inserción, cambio o
+borrado de "Mascotas", "Clientes" y "Funcionario", y la función ``buscar`` lo
+consulta. Usa los mismos términos (trigramas y prefijos de una y dos letras de
+cada palabra) y la misma puntuación que la versión SQL, así que devuelve los
+mismos resultados en el mismo orden; benchmarks/bench_busqueda.py --dsn lo
+comprueba. Para encontrar los candidatos intersecta las listas de los términos,
+empezando por la más corta.
+"""
+import heapq
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+DocKey = Tuple[str, int]
+
+# tabla -> (tipo, campos indexados, columnas que se devuelven). Nunca se incluye la contraseña.
+SOURCES = {
+    "Mascotas": ("mascota", ("nombre_mascota",), ("id", "nombre_mascota", "especie", "raza", "id_dueño")),
+    "Clientes": ("cliente", ("nombre_usuario", "correo"), ("id", "nombre_usuario", "correo")),
+    "Funcionario": ("funcionario", ("nombre", "correo"), ("id", "nombre", "puesto", "correo")),
+}
+
+_WORD_SPLIT = re.compile(r"[^0-9a-zñ]+")
+
+
+def normalize(text) -> str:
+    """Como ``busqueda_normalizar``: minúsculas y sin tildes."""
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    return "".join(c for c in text if not unicodedata.combining(c)).strip()
+
+
+def _words(text: str) -> str:
+    """Como ``busqueda_palabras``: cada palabra precedida de un espacio."""
+    return " " + _WORD_SPLIT.sub(" ", text)
+
+
+def _terms(text: str, words: str) -> Set[str]:
+    terms = {text[i:i + 3] for i in range(len(text) - 2)}
+    for word in [text] + words.split(" "):
+        if word:
+            terms.update((word[:1], word[:2]))
+    return terms
+
+
+def _rank(text: str, words: str, term: str) -> Optional[int]:
+    # Como ``busqueda_rango``: 0 prefijo del campo (o el campo completo), 1 principio de
+    # una palabra ("perez" en "juan perez" o "ana.perez@..."), 2 cualquier otra posición
+    if text.startswith(term):
+        return 0
+    if " " + term in words:
+        return 1
+    if len(term) >= 3 and term in text:
+        return 2
+    return None
+
+
+class SearchIndex:
+    def __init__(self):
+        # Los documentos se numeran internamente: los conjuntos de enteros son más
+        # rápidos de intersectar y ocupan menos que los de tuplas (tipo, id)
+        self.ids: Dict[DocKey, int] = {}
+        self.docs: Dict[int, Tuple[str, Tuple[Tuple[str, str], ...], dict]] = {}  # tipo, (campo, palabras), fila
+        self.postings: Dict[str, Set[int]] = {}
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    @staticmethod
+    def columns(table: str) -> Tuple[str, ...]:
+        """Columnas de ``table`` que se buscan o se devuelven; si no cambia ninguna, no se reindexa."""
+        _, fields, columns = SOURCES[table]
+        return fields + columns
+
+    def add(self, table: str, row: dict) -> None:
+        tipo, fields, columns = SOURCES[table]
+        key = (tipo, row["id"])
+        self.remove(table, row)
+        doc_id = self._next_id
+        self._next_id += 1
+        texts = tuple((text, _words(text)) for text in (normalize(row.get(field) or "") for field in fields) if text)
+        self.ids[key] = doc_id
+        self.docs[doc_id] = (tipo, texts, {column: row.get(column) for column in columns})
+        for text, words in texts:
+            for term in _terms(text, words):
+                self.postings.setdefault(term, set()).add(doc_id)
+
+    def remove(self, table: str, row: dict) -> None:
+        doc_id = self.ids.pop((SOURCES[table][0], row["id"]), None)
+        if doc_id is None:
+            return
+        _, texts, _ = self.docs.pop(doc_id)
+        for text, words in texts:
+            for term in _terms(text, words):
+                doc_ids = self.postings.get(term)
+                if doc_ids is not None:
+                    doc_ids.discard(doc_id)
+                    if not doc_ids:
+                        del self.postings[term]
+
+    def _candidates(self, term: str) -> Set[int]:
+        grams = {term[i:i + 3] for i in range(len(term) - 2)} if len(term) >= 3 else {term}
+        grams = sorted(grams, key=lambda g: len(self.postings.get(g, ())))
+        result = None
+        for gram in grams:
+            doc_ids = self.postings.get(gram)
+            if not doc_ids:
+                return set()
+            result = doc_ids if result is None else result & doc_ids
+            if not result:
+                break
+        return result
+
+    def search(self, query: str, limit: int, tipos: Optional[Iterable[str]] = None) -> List[dict]:
+        terms = normalize(query).split()
+        if not terms:
+            return []
+        tipos = frozenset(tipos) if tipos else frozenset(tipo for tipo, _, _ in SOURCES.values())
+        candidates = None
+        for term in sorted(terms, key=len, reverse=True):
+            doc_ids = self._candidates(term)
+            candidates = doc_ids if candidates is None else candidates & doc_ids
+            if not candidates:
+                return []
+
+        # Puntuación empaquetada en un entero (puntuación, documento), como en buscar():
+        # ordenar enteros es mucho más barato que ordenar tuplas
+        scored = []
+        docs = self.docs
+        for doc_id in candidates:
+            tipo, texts, _ = docs[doc_id]
+            if tipo not in tipos:
+                continue
+            best = None
+            for text, words in texts:
+                total = 0
+                for term in terms:
+                    rank = _rank(text, words, term)
+                    if rank is None:
+                        break
+                    total += rank
+                else:
+                    score = total * 10000 + min(len(text), 9999)
+                    if best is None or score < best:
+                        best = score
+            if best is not None:
+                scored.append(best << 40 | doc_id)
+        mask = (1 << 40) - 1
+        return [
+            {"tipo": docs[doc_id][0], **docs[doc_id][2]}
+            for doc_id in (packed & mask for packed in heapq.nsmallest(limit, scored))
+        ]
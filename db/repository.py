@@ -0,0 +1,308 @@
+"""
+Capa de acceso a datos asíncrona.
+
+Los routers no usan el cliente síncrono de Supabase directamente: describen la
+consulta con una ``Query`` y la ejecutan a través de ``db`` (un ``Repository``).
+El repositorio delega en un backend:
+
+- ``ThreadPoolBackend(SupabaseSyncBackend())``: ejecuta las llamadas bloqueantes
+  del cliente de Supabase en un pool de hilos acotado, de modo que el event loop
+  sigue atendiendo otras peticiones mientras se espera la respuesta de red.
+- ``FakeBackend`` (``db/fake_backend.py``): tablas y storage en memoria, para
+  pruebas de carga locales (``DB_BACKEND=fake``).
+
+Los ``select`` idénticos que coinciden en el tiempo se agrupan (single-flight):
+el primero ejecuta la consulta y los demás esperan su resultado. Tras cualquier
+escritura, las lecturas nuevas sobre esa tabla ya no se unen a las que estaban
+en vuelo, para no devolver datos anteriores a la escritura; un rpc puede
+escribir en cualquier tabla, así que corta todas, salvo los marcados con
+``read_only=True``, que se agrupan como un select más. El ``Result`` es
+compartido: los llamadores no deben modificar ``data``.
+"""
+import asyncio
+import dataclasses
+import functools
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from core.config import settings
+from core.metrics import CallbackMetric, db_query_duration, registry
+
+# (columna, operador, valor). Operadores: eq, neq, gt, gte, lt, lte, like, ilike, in, is, not_is
+Filter = Tuple[str, str, Any]
+
+
+@dataclass(frozen=True)
+class Query:
+    table: str
+    op: str = "select"  # select | insert | update | delete | rpc
+    columns: str = "*"
+    filters: Tuple[Filter, ...] = ()
+    values: Any = None
+    order: Optional[str] = None
+    desc: bool = False
+    limit: Optional[int] = None
+    count: bool = False
+    head: bool = False
+    read_only: bool = False  # rpc que solo lee: se agrupa como un select y no corta las lecturas en vuelo
+
+
+class Result:
+    """Respuesta de una consulta, con la misma forma que la de supabase-py (``data`` y ``count``)."""
+
+    def __init__(self, data: Any = None, count: Optional[int] = None):
+        self.data = data if data is not None else []
+        self.count = count
+
+
+# SQLSTATE de Postgres que significan "choca con datos existentes": unique_violation y exclusion_violation
+CONFLICT_CODES = ("23505", "23P01")
+
+
+def is_conflict(error: Exception) -> bool:
+    """True si ``error`` es un rechazo de la base de datos por unicidad o solapamiento (un 409 para el cliente)."""
+    return getattr(error, "code", None) in CONFLICT_CODES
+
+
+def error_message(error: Exception) -> str:
+    # APIError de postgrest convierte a texto todo el JSON del error; el mensaje va aparte
+    return getattr(error, "message", None) or str(error)
+
+
+def _apply_filter(builder, column: str, op: str, value: Any):
+    if op == "in":
+        return builder.in_(column, value)
+    if op == "is":
+        return builder.is_(column, value)
+    if op == "not_is":
+        return builder.not_.is_(column, value)
+    return getattr(builder, op)(column, value)
+
+
+class SupabaseSyncBackend:
+    """Traduce una ``Query`` al query builder síncrono de supabase-py."""
+
+    def __init__(self, client=None):
+        if client is None:
+            from db.supabase_client import supabase as client
+        self._client = client
+
+    def _build(self, query: Query):
+        if query.op == "rpc":
+            return self._client.rpc(query.table, query.values or {})
+
+        builder = self._client.table(query.table)
+        if query.op == "select":
+            builder = builder.select(
+                query.columns,
+                count="exact" if query.count else None,
+                head=query.head or None,
+            )
+        elif query.op == "insert":
+            builder = builder.insert(query.values)
+        elif query.op == "update":
+            builder = builder.update(query.values)
+        elif query.op == "delete":
+            builder = builder.delete()
+        else:
+            raise ValueError(f"Operación no soportada: {query.op}")
+
+        for column, op, value in query.filters:
+            builder = _apply_filter(builder, column, op, value)
+        if query.order:
+            builder = builder.order(query.order, desc=query.desc)
+        if query.limit is not None:
+            builder = builder.limit(query.limit)
+        return builder
+
+    def execute_sync(self, query: Query) -> Result:
+        response = self._build(query).execute()
+        return Result(response.data, getattr(response, "count", None))
+
+    @staticmethod
+    def _storage_file(file: Any) -> Any:
+        # storage3 solo acepta rutas, bytes, BufferedReader o FileIO. Las subidas
+        # llegan como SpooledTemporaryFile: en memoria (pequeñas) o ya en disco.
+        if not hasattr(file, "read") or isinstance(file, (io.BufferedReader, io.FileIO)):
+            return file
+        spooled = getattr(file, "_file", file)
+        if isinstance(spooled, io.BytesIO):
+            return spooled.getvalue()
+        if isinstance(getattr(spooled, "raw", None), io.FileIO):
+            spooled.flush()
+            return spooled.raw
+        return file.read()
+
+    def upload_sync(self, bucket: str, path: str, file: Any, content_type: Optional[str] = None) -> None:
+        options = {"content-type": content_type} if content_type else None
+        self._client.storage.from_(bucket).upload(path, self._storage_file(file), options)
+
+    def public_url(self, bucket: str, path: str) -> str:
+        return self._client.storage.from_(bucket).get_public_url(path)
+
+
+class ThreadPoolBackend:
+    """Ejecuta un backend síncrono en un pool de hilos de tamaño fijo."""
+
+    def __init__(self, sync_backend, max_workers: int = settings.DB_MAX_WORKERS):
+        self.sync_backend = sync_backend
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args))
+
+    async def execute(self, query: Query) -> Result:
+        return await self._run(self.sync_backend.execute_sync, query)
+
+    async def upload(self, bucket: str, path: str, file: Any, content_type: Optional[str] = None) -> None:
+        await self._run(self.sync_backend.upload_sync, bucket, path, file, content_type)
+
+    def public_url(self, bucket: str, path: str) -> str:
+        return self.sync_backend.public_url(bucket, path)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+def _coalesce_key(query: Query) -> Optional[Query]:
+    # Las listas (p. ej. de un filtro "in") se convierten en tuplas para que la Query sea hashable
+    filters = tuple(
+        (column, op, tuple(value) if isinstance(value, (list, set)) else value)
+        for column, op, value in query.filters
+    )
+    values = query.values
+    if isinstance(values, dict):
+        values = tuple(sorted(
+            (name, tuple(value) if isinstance(value, (list, set)) else value) for name, value in values.items()
+        ))
+    key = dataclasses.replace(query, filters=filters, values=values)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def create_backend():
+    if settings.DB_BACKEND == "fake":
+        from db.fake_backend import FakeBackend
+        return FakeBackend(latency_ms=settings.FAKE_DB_LATENCY_MS)
+    return ThreadPoolBackend(SupabaseSyncBackend(), max_workers=settings.DB_MAX_WORKERS)
+
+
+class Repository:
+    def __init__(self, backend=None, coalesce_reads: bool = settings.DB_COALESCE_READS):
+        self._backend = backend
+        self.coalesce_reads = coalesce_reads
+        self._inflight: Dict[Query, asyncio.Task] = {}
+        # Lecturas atendidas con una consulta que ya estaba en vuelo, por tabla
+        self.coalesced: Dict[str, int] = {}
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = create_backend()
+        return self._backend
+
+    def use_backend(self, backend) -> None:
+        """Reemplaza el backend (por ejemplo, por un ``FakeBackend`` en benchmarks)."""
+        self._backend = backend
+
+    async def _execute(self, query: Query) -> Result:
+        start = time.perf_counter()
+        try:
+            return await self.backend.execute(query)
+        finally:
+            db_query_duration.observe((query.table, query.op), time.perf_counter() - start)
+
+    def _forget_inflight(self, table: Optional[str] = None) -> None:
+        # Las peticiones que ya esperan conservan su resultado; las nuevas lanzan otra consulta
+        for key in [k for k in self._inflight if table is None or k.table == table]:
+            del self._inflight[key]
+
+    def _on_done(self, key: Query, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # marca la excepción como recuperada aunque nadie quede esperando
+
+    async def execute(self, query: Query) -> Result:
+        if query.op != "select" and not query.read_only:
+            try:
+                return await self._execute(query)
+            finally:
+                # Un rpc puede escribir en cualquier tabla
+                self._forget_inflight(None if query.op == "rpc" else query.table)
+
+        key = _coalesce_key(query) if self.coalesce_reads else None
+        if key is None:
+            return await self._execute(query)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._execute(query))
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._on_done, key))
+        else:
+            self.coalesced[query.table] = self.coalesced.get(query.table, 0) + 1
+        # shield: si se cancela una petición, la consulta sigue para las demás que la esperan
+        return await asyncio.shield(task)
+
+    async def select(
+        self,
+        table: str,
+        columns: str = "*",
+        filters: Sequence[Filter] = (),
+        order: Optional[str] = None,
+        desc: bool = False,
+        limit: Optional[int] = None,
+        count: bool = False,
+        head: bool = False,
+    ) -> Result:
+        return await self.execute(Query(
+            table, "select", columns, tuple(filters),
+            order=order, desc=desc, limit=limit, count=count, head=head,
+        ))
+
+    async def count(self, table: str, filters: Sequence[Filter] = ()) -> int:
+        """Cuenta filas en el servidor sin descargarlas (``count=exact`` + ``HEAD``)."""
+        response = await self.select(table, "id", filters, count=True, head=True)
+        return response.count or 0
+
+    async def insert(self, table: str, values: Any) -> Result:
+        return await self.execute(Query(table, "insert", values=values))
+
+    async def update(self, table: str, values: dict, filters: Sequence[Filter]) -> Result:
+        return await self.execute(Query(table, "update", filters=tuple(filters), values=values))
+
+    async def delete(self, table: str, filters: Sequence[Filter]) -> Result:
+        return await self.execute(Query(table, "delete", filters=tuple(filters)))
+
+    async def rpc(self, function: str, params: Optional[dict] = None, read_only: bool = False) -> Result:
+        """``read_only=True`` solo para funciones que no escriben (se agrupan con las llamadas idénticas en vuelo)."""
+        return await self.execute(Query(function, "rpc", values=params or {}, read_only=read_only))
+
+    async def upload(self, bucket: str, path: str, file: Any, content_type: Optional[str] = None) -> None:
+        start = time.perf_counter()
+        try:
+            await self.backend.upload(bucket, path, file, content_type)
+        finally:
+            db_query_duration.observe((f"storage:{bucket}", "upload"), time.perf_counter() - start)
+
+    def public_url(self, bucket: str, path: str) -> str:
+        return self.backend.public_url(bucket, path)
+
+
+db = Repository()
+
+registry.register(CallbackMetric(
+    "db_coalesced_reads_total", "Lecturas atendidas por una consulta idéntica ya en vuelo", "counter",
+    lambda: {(table,): total for table, total in db.coalesced.items()},
+    ("table",),
+))
+registry.register(CallbackMetric(
+    "db_inflight_reads", "Lecturas distintas en vuelo", "gauge", lambda: len(db._inflight),
+))
@@ -0,0 +1,320 @@
+-- Búsqueda por nombre/correo de GET /buscar (services/busqueda.py).
+--
+-- Índice invertido en tablas normales, sin extensiones: los triggers de
+-- "Mascotas", "Clientes" y "Funcionario" mantienen un documento por fila
+-- ("BusquedaDocumentos") y sus términos ("BusquedaTerminos") en la misma
+-- transacción que cada alta, cambio o borrado, así que todos los workers ven lo
+-- mismo. Los términos de un documento son los trigramas de sus campos (para
+-- buscar cualquier fragmento de tres o más letras) y los prefijos de una y dos
+-- letras de cada palabra (para la búsqueda mientras se escribe, que con
+-- trigramas no tendría índice).
+--
+-- Se busca en minúsculas y sin tildes. Cada término de la búsqueda tiene que
+-- aparecer en un mismo campo (los de una o dos letras, al principio de una
+-- palabra). Puntuación de un campo (menor es mejor): por cada término, 0 si es
+-- prefijo del campo, 1 si empieza una palabra y 2 en otra posición; la suma por
+-- 10000 más la longitud del campo, así que la coincidencia exacta (el campo más
+-- corto con ese prefijo) va primero. Un documento vale lo que su mejor campo; a
+-- igualdad, gana el indexado antes.
+--
+-- Cada término guarda su puntuación en el documento, que es también una cota
+-- inferior de la de cualquier búsqueda cuyo término más largo empiece por él
+-- (si el término largo está en una posición, su principio también). Si algún
+-- término del índice que tendría que estar en el resultado (un trigrama de la
+-- búsqueda) tiene pocos documentos, buscar() los lee todos; si no, recorre los
+-- del principio del término más largo en orden de esa cota y se detiene en
+-- cuanto los ``p_limit`` mejores ya no pueden mejorar: con términos frecuentes
+-- lee unas pocas decenas de filas y no la lista entera.
+
+-- Igual que db/fake_search.py:normalize para el español (unaccent necesitaría una extensión)
+create or replace function busqueda_normalizar(p_texto text)
+returns text
+language sql
+immutable
+parallel safe
+as $$
+    select btrim(translate(lower(coalesce(p_texto, '')), 'áàâäãåéèêëíìîïóòôöõúùûüýÿñç', 'aaaaaaeeeeiiiiooooouuuuyync'));
+$$;
+
+-- Las palabras de un campo normalizado, cada una precedida de un espacio: ' ana perez gmail com'
+create or replace function busqueda_palabras(p_texto text)
+returns text
+language sql
+immutable
+parallel safe
+as $$
+    select ' ' || regexp_replace(p_texto, '[^0-9a-z]+', ' ', 'g');
+$$;
+
+-- Rango de un término en un campo: 0 prefijo (o el campo completo), 1 principio de palabra,
+-- 2 otra posición (solo términos de tres o más letras); null si no aparece
+create or replace function busqueda_rango(p_texto text, p_palabras text, p_termino text)
+returns integer
+language sql
+immutable
+parallel safe
+as $$
+    select case
+        when left(p_texto, length(p_termino)) = p_termino then 0
+        when strpos(p_palabras, ' ' || p_termino) > 0 then 1
+        when length(p_termino) >= 3 and strpos(p_texto, p_termino) > 0 then 2
+    end;
+$$;
+
+-- Puntuación de un documento para una búsqueda, o null si ningún campo contiene todos los términos.
+-- En plpgsql y no en sql: con unnest y lateral cada llamada cuesta unas seis veces más.
+create or replace function busqueda_puntuacion(p_textos text[], p_palabras text[], p_terminos text[])
+returns integer
+language plpgsql
+immutable
+parallel safe
+as $$
+declare
+    v_mejor integer;
+    v_total integer;
+    v_rango integer;
+    v_termino text;
+begin
+    for i in 1 .. coalesce(array_length(p_textos, 1), 0) loop
+        v_total := 0;
+        foreach v_termino in array p_terminos loop
+            v_rango := busqueda_rango(p_textos[i], p_palabras[i], v_termino);
+            if v_rango is null then
+                v_total := null;
+                exit;
+            end if;
+            v_total := v_total + v_rango;
+        end loop;
+        if v_total is not null then
+            v_total := v_total * 10000 + least(length(p_textos[i]), 9999);
+            if v_mejor is null or v_total < v_mejor then
+                v_mejor := v_total;
+            end if;
+        end if;
+    end loop;
+    return v_mejor;
+end;
+$$;
+
+create or replace function busqueda_like(p_termino text)
+returns text
+language sql
+immutable
+parallel safe
+as $$
+    select replace(replace(replace(p_termino, '\', '\\'), '%', '\%'), '_', '\_');
+$$;
+
+create table if not exists "BusquedaDocumentos" (
+    "id" bigint generated always as identity primary key,
+    "tipo" text not null,
+    "origen" bigint not null,
+    "textos" text[] not null,    -- campos indexados, normalizados
+    "palabras" text[] not null,  -- busqueda_palabras de cada campo
+    "texto" text not null,       -- los campos separados por espacios, para descartar con like
+    "fila" jsonb not null        -- lo que devuelve buscar(); nunca la contraseña
+);
+create unique index if not exists busqueda_documentos_origen on "BusquedaDocumentos" ("tipo", "origen");
+
+create table if not exists "BusquedaTerminos" (
+    "documento" bigint not null references "BusquedaDocumentos" (id) on delete cascade,
+    "termino" text not null,
+    "cota" integer not null,
+    primary key ("documento", "termino")
+);
+create index if not exists busqueda_terminos_termino on "BusquedaTerminos" ("termino", "cota", "documento");
+
+-- Crea o reemplaza el documento de una fila de origen
+create or replace function busqueda_guardar(p_tipo text, p_origen bigint, p_campos text[], p_fila jsonb)
+returns void
+language plpgsql
+as $$
+declare
+    v_textos text[];
+    v_palabras text[];
+    v_documento bigint;
+begin
+    delete from "BusquedaDocumentos" where tipo = p_tipo and origen = p_origen;
+    select coalesce(array_agg(t), '{}'), coalesce(array_agg(busqueda_palabras(t)), '{}') into v_textos, v_palabras
+    from (select busqueda_normalizar(c) as t from unnest(p_campos) c) n
+    where t <> '';
+    insert into "BusquedaDocumentos" (tipo, origen, textos, palabras, texto, fila)
+    values (p_tipo, p_origen, v_textos, v_palabras, array_to_string(v_textos, ' '), p_fila)
+    returning id into v_documento;
+
+    insert into "BusquedaTerminos" (documento, termino, cota)
+    select v_documento, g.termino, min(r.rango * 10000 + least(length(c.texto), 9999))
+    from unnest(v_textos, v_palabras) as c(texto, palabras),
+    lateral (
+        select substr(c.texto, n, 3) as termino from generate_series(1, length(c.texto) - 2) n
+        union
+        select left(p.palabra, l)
+        from (select c.texto as palabra union all select w from regexp_split_to_table(c.palabras, ' ') w) p,
+             generate_series(1, 2) l
+        where p.palabra <> ''
+    ) g,
+    lateral (select busqueda_rango(c.texto, c.palabras, g.termino) as rango) r
+    where r.rango is not null
+    group by g.termino;
+end;
+$$;
+
+create or replace function busqueda_indexar()
+returns trigger
+language plpgsql
+as $$
+declare
+    v_tipo text := tg_argv[0];
+    v_campos text[] := string_to_array(tg_argv[1], ',');
+    v_columnas text[] := string_to_array(tg_argv[2], ',');
+    v_fila jsonb;
+begin
+    if tg_op = 'DELETE' then
+        delete from "BusquedaDocumentos" where tipo = v_tipo and origen = old.id;
+        return null;
+    end if;
+    v_fila := to_jsonb(new);
+    if tg_op = 'UPDATE' then
+        if old.id <> new.id then
+            delete from "BusquedaDocumentos" where tipo = v_tipo and origen = old.id;
+        elsif (select bool_and(to_jsonb(old)->c is not distinct from v_fila->c) from unnest(v_columnas || v_campos) c) then
+            return null;  -- no cambió nada de lo que se busca ni de lo que se devuelve
+        end if;
+    end if;
+    perform busqueda_guardar(
+        v_tipo, new.id,
+        array(select v_fila->>c from unnest(v_campos) c),
+        jsonb_build_object('tipo', v_tipo) || (select jsonb_object_agg(c, v_fila->c) from unnest(v_columnas) c)
+    );
+    return null;
+end;
+$$;
+
+drop trigger if exists busqueda_indexar on "Mascotas";
+create trigger busqueda_indexar
+    after insert or update or delete on "Mascotas"
+    for each row execute function busqueda_indexar('mascota', 'nombre_mascota', 'id,nombre_mascota,especie,raza,id_dueño');
+drop trigger if exists busqueda_indexar on "Clientes";
+create trigger busqueda_indexar
+    after insert or update or delete on "Clientes"
+    for each row execute function busqueda_indexar('cliente', 'nombre_usuario,correo', 'id,nombre_usuario,correo');
+drop trigger if exists busqueda_indexar on "Funcionario";
+create trigger busqueda_indexar
+    after insert or update or delete on "Funcionario"
+    for each row execute function busqueda_indexar('funcionario', 'nombre,correo', 'id,nombre,puesto,correo');
+
+-- Usado con db.rpc("buscar", {"p_q": ..., "p_tipos": [...], "p_limit": 20}, read_only=True).
+-- Devuelve [{"tipo": "mascota" | "cliente" | "funcionario", "id": ..., ...}, ...]
+create or replace function buscar(p_q text, p_tipos text[] default null, p_limit integer default 20)
+returns jsonb
+language plpgsql
+stable
+as $$
+declare
+    v_terminos text[];
+    v_clave text;
+    v_patrones text[];
+    v_necesarios text[];
+    v_otras text[];
+    v_frecuencia bigint;
+    v_acotado boolean;
+    v_tipos text[] := coalesce(p_tipos, array['mascota', 'cliente', 'funcionario']);
+    v_candidato record;
+    v_lote integer;
+    v_leidos integer;
+    v_cota integer := -1;
+    v_documento bigint := 0;
+    v_mejores bigint[] := '{}';  -- puntuación << 40 | documento, ordenados; como mucho p_limit
+    v_puntuacion integer;
+    v_orden bigint;
+    v_resultado jsonb;
+begin
+    select coalesce(array_agg(t order by length(t) desc), '{}') into v_terminos
+    from unnest(regexp_split_to_array(busqueda_normalizar(p_q), '\s+')) as t
+    where t <> '';
+    if cardinality(v_terminos) = 0 or p_limit <= 0 then
+        return '[]'::jsonb;
+    end if;
+    select array_agg('%' || busqueda_like(t) || '%') into v_patrones from unnest(v_terminos) t;
+    -- Términos del índice que tiene que tener cualquier resultado: los trigramas de cada término
+    -- de la búsqueda, o el término entero si es de una o dos letras
+    select array_agg(distinct g) into v_necesarios
+    from unnest(v_terminos) t,
+    lateral (select substr(t, n, 3) as g from generate_series(1, greatest(length(t) - 2, 1)) n) s;
+    -- Se recorre el más raro si tiene pocos documentos (entonces sin cota); si todos son
+    -- frecuentes, el principio del término más largo, en orden de cota
+    select g, n into v_clave, v_frecuencia
+    from unnest(v_necesarios) g,
+    lateral (select count(*) as n from (select 1 from "BusquedaTerminos" where termino = g limit 1000) l) c
+    order by n, length(g) desc, g
+    limit 1;
+    v_acotado := v_frecuencia >= 1000;
+    if v_acotado then
+        v_clave := left(v_terminos[1], 3);
+        select coalesce(array_agg(distinct left(t, 3)), '{}') into v_otras
+        from unnest(v_terminos[2:]) t
+        where left(t, 3) <> v_clave;
+    else
+        v_otras := array_remove(v_necesarios, v_clave);
+    end if;
+
+    -- Por lotes con limit y el documento leído por su clave (lateral con offset 0): si no, el
+    -- planificador ordena la lista entera del término o recorre todos los documentos
+    v_lote := greatest(p_limit * 2, 32);
+    <<lotes>>
+    loop
+        v_leidos := 0;
+        for v_candidato in execute
+            'select t.cota, t.documento, d.textos, d.palabras
+             from (
+                 select t.cota, t.documento
+                 from "BusquedaTerminos" t
+                 where t.termino = $1 and (t.cota, t.documento) > ($2, $3)
+                   and (select count(*) from "BusquedaTerminos" o where o.documento = t.documento and o.termino = any($7)) = cardinality($7)
+                 order by t.cota, t.documento
+                 limit $6
+             ) t
+             left join lateral (
+                 select d.textos, d.palabras
+                 from "BusquedaDocumentos" d
+                 where d.id = t.documento and d.tipo = any($4) and d.texto like all($5)
+                 offset 0
+             ) d on true
+             order by t.cota, t.documento'
+            using v_clave, v_cota, v_documento, v_tipos, v_patrones, v_lote, v_otras
+        loop
+            v_leidos := v_leidos + 1;
+            v_cota := v_candidato.cota;
+            v_documento := v_candidato.documento;
+            -- Ningún documento que quede puede puntuar por debajo de su cota
+            exit lotes when v_acotado and cardinality(v_mejores) >= p_limit
+                        and v_mejores[p_limit] < ((v_cota::bigint << 40) | v_documento);
+            continue when v_candidato.textos is null;
+            v_puntuacion := busqueda_puntuacion(v_candidato.textos, v_candidato.palabras, v_terminos);
+            continue when v_puntuacion is null;
+            v_orden := (v_puntuacion::bigint << 40) | v_documento;
+            continue when cardinality(v_mejores) >= p_limit and v_orden >= v_mejores[p_limit];
+            select array_agg(o order by o) into v_mejores
+            from (select o from unnest(v_mejores || v_orden) o order by o limit p_limit) m;
+        end loop;
+        exit when v_leidos < v_lote;
+        v_lote := least(v_lote * 4, 2000);
+    end loop;
+
+    select coalesce(jsonb_agg(d.fila order by m.posicion), '[]'::jsonb) into v_resultado
+    from unnest(v_mejores) with ordinality as m(orden, posicion)
+    join "BusquedaDocumentos" d on d.id = m.orden & ((1::bigint << 40) - 1);
+    return v_resultado;
+end;
+$$;
+
+-- Carga inicial de las filas que ya existían (volver a ejecutarlo las reindexa)
+select busqueda_guardar('mascota', id, array[nombre_mascota],
+    jsonb_build_object('tipo', 'mascota', 'id', id, 'nombre_mascota', nombre_mascota, 'especie', especie, 'raza', raza, 'id_dueño', "id_dueño"))
+from "Mascotas";
+select busqueda_guardar('cliente', id, array[nombre_usuario, correo],
+    jsonb_build_object('tipo', 'cliente', 'id', id, 'nombre_usuario', nombre_usuario, 'correo', correo))
+from "Clientes";
+select busqueda_guardar('funcionario', id, array[nombre, correo],
+    jsonb_build_object('tipo', 'funcionario', 'id', id, 'nombre', nombre, 'puesto', puesto, 'correo', correo))
+from "Funcionario";
@@ -0,0 +1,47 @@
+-- Versión de cada tabla cuyas lecturas guarda la caché de la API (core/cache.py).
+-- Cada sentencia que escribe en la tabla sube su versión en la misma transacción;
+-- los workers consultan esta tabla cada CACHE_SYNC_INTERVAL_SECONDS y vacían las
+-- entradas que dependen de una tabla que cambió, venga la escritura del worker
+-- que venga (o de fuera de la API).
+create table if not exists "CacheVersiones" (
+    "tabla" text primary key,
+    "version" bigint not null default 0
+);
+
+create or replace function cache_versiones_subir()
+returns trigger
+language plpgsql
+as $$
+begin
+    -- Una vez por sentencia, no por fila: una carga masiva sube la versión una sola vez
+    insert into "CacheVersiones" as v ("tabla", "version")
+    values (tg_table_name, 1)
+    on conflict ("tabla") do update set "version" = v."version" + 1;
+    return null;
+end;
+$$;
+
+drop trigger if exists cache_versiones_subir on "Clientes";
+create trigger cache_versiones_subir
+    after insert or update or delete or truncate on "Clientes"
+    for each statement execute function cache_versiones_subir();
+drop trigger if exists cache_versiones_subir on "Funcionario";
+create trigger cache_versiones_subir
+    after insert or update or delete or truncate on "Funcionario"
+    for each statement execute function cache_versiones_subir();
+drop trigger if exists cache_versiones_subir on "Mascotas";
+create trigger cache_versiones_subir
+    after insert or update or delete or truncate on "Mascotas"
+    for each statement execute function cache_versiones_subir();
+drop trigger if exists cache_versiones_subir on "Citas";
+create trigger cache_versiones_subir
+    after insert or update or delete or truncate on "Citas"
+    for each statement execute function cache_versiones_subir();
+drop trigger if exists cache_versiones_subir on "Historial";
+create trigger cache_versiones_subir
+    after insert or update or delete or truncate on "Historial"
+    for each statement execute function cache_versiones_subir();
+drop trigger if exists cache_versiones_subir on "Vacunas";
+create trigger cache_versiones_subir
+    after insert or update or delete or truncate on "Vacunas"
+    for each statement execute function cache_versiones_subir();
@@ -0,0 +1,12 @@
+-- Número de citas programadas por veterinario, agrupado en la base de datos.
+-- Usado por GET /dashboard/ (db.rpc("citas_por_veterinario")).
+create or replace function citas_por_veterinario()
+returns table (id_veterinario bigint, total bigint)
+language sql
+stable
+as $$
+    select "id_veterinario", count(*)
+    from "Citas"
+    where "id_veterinario" is not null
+    group by "id_veterinario";
+$$;
@@ -0,0 +1,52 @@
+-- Un veterinario no puede tener dos citas que se solapen el mismo día.
+-- Es la comprobación que vale con varios workers: services/disponibilidad.py
+-- solo adelanta el error y calcula los huecos libres. El trigger toma un lock
+-- por veterinario y día hasta el final de la transacción, así que dos altas
+-- simultáneas del mismo día se comprueban una detrás de otra, vengan del
+-- worker que vengan. Un choque da el error exclusion_violation (23P01), que la
+-- API devuelve como 409.
+drop index if exists citas_veterinario_fecha_hora;
+create index if not exists citas_veterinario_fecha on "Citas" ("id_veterinario", "fecha_cita");
+
+-- Duración de cada cita; tiene que coincidir con CITA_DURACION_MINUTOS
+create or replace function citas_duracion_minutos()
+returns integer
+language sql
+immutable
+as $$
+    select 30;
+$$;
+
+create or replace function citas_sin_solapamiento()
+returns trigger
+language plpgsql
+as $$
+declare
+    v_choque time;
+begin
+    if new.id_veterinario is null or new.fecha_cita is null or new.hora_cita is null then
+        return new;
+    end if;
+    perform pg_advisory_xact_lock(hashtextextended(format('Citas/%s/%s', new.id_veterinario, new.fecha_cita), 0));
+    -- Misma regla que AvailabilityIndex._conflict: menos de una duración entre las horas de inicio
+    select c.hora_cita::time into v_choque
+    from "Citas" c
+    where c.id_veterinario = new.id_veterinario
+      and c.fecha_cita = new.fecha_cita
+      and c.id is distinct from new.id
+      and abs(extract(epoch from c.hora_cita::time - new.hora_cita::time)) < citas_duracion_minutos() * 60
+    order by c.hora_cita::time
+    limit 1;
+    if found then
+        raise exception using
+            errcode = 'exclusion_violation',
+            message = format('El veterinario ya tiene una cita a las %s ese día', to_char(v_choque, 'HH24:MI'));
+    end if;
+    return new;
+end;
+$$;
+
+drop trigger if exists citas_sin_solapamiento on "Citas";
+create trigger citas_sin_solapamiento
+    before insert or update of "id_veterinario", "fecha_cita", "hora_cita" on "Citas"
+    for each row execute function citas_sin_solapamiento();
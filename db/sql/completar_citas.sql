@@ -0,0 +1,38 @@
+-- Completa un lote de citas en una sola transacción: cada cita se borra de
+-- "Citas" y se registra en "Historial". Una cita inexistente se informa en el
+-- resultado sin abortar las demás.
+-- Usado por services/citas.py (db.rpc("completar_citas", {"p_citas": [...]})).
+--
+-- p_citas: [{"id_cita": 1, "tipo": "...", "motivo": "...", "resultado": "..."}, ...]
+-- Devuelve: [{"id_cita": 1, "ok": true, "cita": {...}, "historial": {...}}
+--            | {"id_cita": 2, "ok": false, "error": "Cita no encontrada"}, ...]
+create or replace function completar_citas(p_citas jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+    item jsonb;
+    cita "Citas"%rowtype;
+    historial "Historial"%rowtype;
+    resultados jsonb := '[]'::jsonb;
+begin
+    for item in select * from jsonb_array_elements(p_citas) loop
+        delete from "Citas" where id = (item->>'id_cita')::bigint returning * into cita;
+        if not found then
+            resultados := resultados || jsonb_build_array(jsonb_build_object(
+                'id_cita', item->'id_cita', 'ok', false, 'error', 'Cita no encontrada'
+            ));
+            continue;
+        end if;
+
+        insert into "Historial" (id_mascota, fecha, tipo, descripcion, veterinario_id, resultado)
+        values (cita.id_mascota, cita.fecha_cita, item->>'tipo', item->>'motivo', cita.id_veterinario, item->>'resultado')
+        returning * into historial;
+
+        resultados := resultados || jsonb_build_array(jsonb_build_object(
+            'id_cita', cita.id, 'ok', true, 'cita', to_jsonb(cita), 'historial', to_jsonb(historial)
+        ));
+    end loop;
+    return resultados;
+end;
+$$;
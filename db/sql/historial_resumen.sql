@@ -0,0 +1,158 @@
+-- Agregados de "Historial" para GET /dashboard/analytics (services/analytics.py).
+-- Una fila por día, veterinario, especie de la mascota y resultado, con el número
+-- de visitas. El trigger los actualiza en la misma transacción que cada cambio en
+-- "Historial" (también dentro de completar_citas), así que todos los workers ven
+-- los mismos totales. La especie es la que tiene la mascota ahora: cuando cambia
+-- (o se borra la mascota), el trigger de "Mascotas" pasa sus visitas de una especie
+-- a otra. La carga inicial del final se ejecuta una sola vez, con el script; volver
+-- a ejecutarlo recalcula la tabla desde cero.
+create table if not exists "HistorialResumen" (
+    "dia" date not null,
+    "veterinario_id" bigint,
+    "especie" text not null,
+    "resultado" text not null,
+    "total" bigint not null default 0
+);
+create unique index if not exists historial_resumen_clave
+    on "HistorialResumen" ("dia", (coalesce("veterinario_id", 0)), "especie", "resultado");
+-- Visitas de una mascota, para moverlas cuando cambia su especie
+create index if not exists historial_mascota on "Historial" ("id_mascota");
+
+create or replace function historial_resumen_sumar(
+    p_fecha date, p_mascota bigint, p_veterinario bigint, p_resultado text, p_cantidad integer
+)
+returns void
+language plpgsql
+as $$
+declare
+    v_especie text;
+begin
+    if p_fecha is null then
+        return;
+    end if;
+    -- for share: un cambio de especie simultáneo espera a esta transacción (y la ve al mover
+    -- las visitas), o esta espera al cambio y suma ya en la especie nueva
+    select "especie" into v_especie from "Mascotas" where id = p_mascota for share;
+    insert into "HistorialResumen" ("dia", "veterinario_id", "especie", "resultado", "total")
+    values (
+        p_fecha, p_veterinario, coalesce(nullif(v_especie, ''), 'Desconocida'),
+        coalesce(nullif(p_resultado, ''), 'Sin resultado'), p_cantidad
+    )
+    on conflict ("dia", (coalesce("veterinario_id", 0)), "especie", "resultado")
+    do update set "total" = "HistorialResumen"."total" + excluded."total";
+end;
+$$;
+
+create or replace function historial_resumen_trigger()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        perform historial_resumen_sumar(old.fecha::date, old.id_mascota, old.veterinario_id, old.resultado, -1);
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        perform historial_resumen_sumar(new.fecha::date, new.id_mascota, new.veterinario_id, new.resultado, 1);
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists historial_resumen on "Historial";
+create trigger historial_resumen
+    after insert or update or delete on "Historial"
+    for each row execute function historial_resumen_trigger();
+
+-- Pasa las visitas de una mascota de la especie p_antes a p_despues (null = 'Desconocida')
+create or replace function historial_resumen_mover(p_mascota bigint, p_antes text, p_despues text)
+returns void
+language plpgsql
+as $$
+declare
+    v_antes text := coalesce(nullif(p_antes, ''), 'Desconocida');
+    v_despues text := coalesce(nullif(p_despues, ''), 'Desconocida');
+begin
+    if v_antes = v_despues then
+        return;
+    end if;
+    insert into "HistorialResumen" ("dia", "veterinario_id", "especie", "resultado", "total")
+    select h.fecha::date, h.veterinario_id, e.especie, coalesce(nullif(h.resultado, ''), 'Sin resultado'), e.signo * count(*)
+    from "Historial" h,
+         (values (v_antes, -1), (v_despues, 1)) as e(especie, signo)
+    where h.id_mascota = p_mascota and h.fecha is not null
+    group by 1, 2, 3, 4, e.signo
+    on conflict ("dia", (coalesce("veterinario_id", 0)), "especie", "resultado")
+    do update set "total" = "HistorialResumen"."total" + excluded."total";
+end;
+$$;
+
+create or replace function historial_resumen_especie_trigger()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op = 'DELETE' then
+        perform historial_resumen_mover(old.id, old.especie, null);
+    elsif old.id = new.id then
+        perform historial_resumen_mover(new.id, old.especie, new.especie);
+    else
+        perform historial_resumen_mover(old.id, old.especie, null);
+        perform historial_resumen_mover(new.id, null, new.especie);
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists historial_resumen_especie on "Mascotas";
+create trigger historial_resumen_especie
+    after update of "id", "especie" or delete on "Mascotas"
+    for each row execute function historial_resumen_especie_trigger();
+
+-- Totales de un rango de fechas (ambos extremos opcionales), con la forma que
+-- devuelve GET /dashboard/analytics. Solo lee las filas de resumen del rango.
+-- Usado con db.rpc("resumen_historial", {...}, read_only=True).
+create or replace function resumen_historial(p_desde date default null, p_hasta date default null)
+returns jsonb
+language sql
+stable
+as $$
+    with filas as (
+        select * from "HistorialResumen"
+        where (p_desde is null or "dia" >= p_desde)
+          and (p_hasta is null or "dia" <= p_hasta)
+          and "total" <> 0
+    )
+    select jsonb_build_object(
+        'total', coalesce((select sum("total") from filas), 0),
+        'por_mes', coalesce((
+            select jsonb_object_agg(mes, total order by mes)
+            from (select to_char("dia", 'YYYY-MM') as mes, sum("total") as total from filas group by 1) t
+        ), '{}'::jsonb),
+        'por_veterinario', coalesce((
+            select jsonb_object_agg(coalesce(veterinario_id::text, 'null'), total)
+            from (select "veterinario_id" as veterinario_id, sum("total") as total from filas group by 1) t
+        ), '{}'::jsonb),
+        'por_especie', coalesce((
+            select jsonb_object_agg(especie, total)
+            from (select "especie" as especie, sum("total") as total from filas group by 1) t
+        ), '{}'::jsonb),
+        'por_resultado', coalesce((
+            select jsonb_object_agg(resultado, total)
+            from (select "resultado" as resultado, sum("total") as total from filas group by 1) t
+        ), '{}'::jsonb)
+    );
+$$;
+
+-- Carga inicial. El lock bloquea las escrituras en "Historial" mientras se
+-- recalcula, para que el trigger no sume dos veces las visitas de entre medias.
+begin;
+lock table "Historial" in share mode;
+truncate "HistorialResumen";
+insert into "HistorialResumen" ("dia", "veterinario_id", "especie", "resultado", "total")
+select h.fecha::date, h.veterinario_id, coalesce(nullif(m.especie, ''), 'Desconocida'),
+       coalesce(nullif(h.resultado, ''), 'Sin resultado'), count(*)
+from "Historial" h
+left join "Mascotas" m on m.id = h.id_mascota
+where h.fecha is not null
+group by 1, 2, 3, 4;
+commit;
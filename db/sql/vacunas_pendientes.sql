@@ -0,0 +1,100 @@
+-- Columnas que usa services/vacunas_pendientes.py para calcular las próximas dosis.
+-- Los nombres se pueden cambiar con VACUNAS_INTERVALO_CAMPO y VACUNAS_FECHA_CAMPO.
+alter table "Vacunas" add column if not exists "intervalo_dias" integer;  -- null = VACUNAS_INTERVALO_DIAS, 0 = sin refuerzo
+alter table "VacunasMascotas" add column if not exists "created_at" timestamptz not null default now();
+
+-- Recálculo por mascota tras asociar una vacuna
+create index if not exists vacunas_mascotas_mascota on "VacunasMascotas" ("mascota");
+
+-- Resultado del cálculo: una fila por (mascota, vacuna) con refuerzo, identificada
+-- por el id de su última aplicación. La comparten todos los workers;
+-- GET /vacunas/pendientes la lee paginando por "id".
+create table if not exists "VacunasPendientes" (
+    "id" bigint primary key references "VacunasMascotas" (id) on delete cascade,
+    "mascota" bigint not null references "Mascotas" (id) on delete cascade,
+    "nombre_mascota" text,
+    "id_dueño" bigint,
+    "vacuna" bigint not null,
+    "nombre_vacuna" text,
+    "ultima_aplicacion" date not null,
+    "proxima_dosis" date not null,
+    "actualizado" timestamptz not null default now()
+);
+create index if not exists vacunas_pendientes_mascota on "VacunasPendientes" ("mascota");
+create index if not exists vacunas_pendientes_proxima on "VacunasPendientes" ("proxima_dosis");
+create index if not exists vacunas_pendientes_actualizado on "VacunasPendientes" ("actualizado");
+
+-- Cuándo se calcularon por última vez las dosis de cada mascota. Es lo que protege un
+-- refresco de un recálculo completo más lento, también si dejó a la mascota sin filas.
+create table if not exists "VacunasPendientesMascotas" (
+    "mascota" bigint primary key references "Mascotas" (id) on delete cascade,
+    "actualizado" timestamptz not null default now()
+);
+
+-- Reemplaza en una transacción las filas de las mascotas indicadas por las recién
+-- calculadas. Con p_calculado (recálculo completo) se saltan las mascotas que otro
+-- worker refrescó después de ese momento, para no pisarlas con datos anteriores.
+-- Primero se marca cada mascota en "VacunasPendientesMascotas": si un refresco de
+-- la misma mascota está en curso, se espera a que termine y se vuelve a comprobar.
+-- Usado por services/vacunas_pendientes.py (db.rpc("vacunas_pendientes_reemplazar", {...})).
+create or replace function vacunas_pendientes_reemplazar(
+    p_mascotas bigint[], p_filas jsonb, p_calculado timestamptz default null
+)
+returns void
+language plpgsql
+as $$
+declare
+    v_mascotas bigint[];
+begin
+    with marcadas as (
+        insert into "VacunasPendientesMascotas" as vpm ("mascota", "actualizado")
+        select m.id, now() from "Mascotas" m where m.id = any(p_mascotas)
+        order by m.id
+        on conflict ("mascota") do update set "actualizado" = excluded."actualizado"
+        where p_calculado is null or vpm."actualizado" <= p_calculado
+        returning vpm."mascota"
+    )
+    select coalesce(array_agg("mascota"), '{}') into v_mascotas from marcadas;
+
+    delete from "VacunasPendientes" where "mascota" = any(v_mascotas);
+    insert into "VacunasPendientes"
+        ("id", "mascota", "nombre_mascota", "id_dueño", "vacuna", "nombre_vacuna", "ultima_aplicacion", "proxima_dosis")
+    select f.id, f.mascota, f.nombre_mascota, f."id_dueño", f.vacuna, f.nombre_vacuna, f.ultima_aplicacion, f.proxima_dosis
+    from jsonb_to_recordset(p_filas) as f(
+        id bigint, mascota bigint, nombre_mascota text, "id_dueño" bigint, vacuna bigint,
+        nombre_vacuna text, ultima_aplicacion date, proxima_dosis date
+    )
+    where f.mascota = any(v_mascotas)
+    on conflict ("id") do update set
+        "mascota" = excluded."mascota",
+        "nombre_mascota" = excluded."nombre_mascota",
+        "id_dueño" = excluded."id_dueño",
+        "vacuna" = excluded."vacuna",
+        "nombre_vacuna" = excluded."nombre_vacuna",
+        "ultima_aplicacion" = excluded."ultima_aplicacion",
+        "proxima_dosis" = excluded."proxima_dosis",
+        "actualizado" = now();
+end;
+$$;
+
+-- Última ejecución de cada tarea periódica, compartida por todos los workers
+create table if not exists "TareasPeriodicas" (
+    "nombre" text primary key,
+    "ultima_ejecucion" timestamptz not null
+);
+
+-- Reserva la ejecución de una tarea: devuelve su hora (la de la base de datos) a un
+-- solo worker por intervalo y null a los demás. La fila queda bloqueada hasta el final
+-- de la transacción, así que dos llamadas simultáneas se ordenan y la segunda ya ve la
+-- hora de la primera.
+-- Usado por services/vacunas_pendientes.py (db.rpc("tarea_periodica_reservar", {...})).
+create or replace function tarea_periodica_reservar(p_nombre text, p_intervalo double precision)
+returns timestamptz
+language sql
+as $$
+    insert into "TareasPeriodicas" as t ("nombre", "ultima_ejecucion")
+    values (p_nombre, now())
+    on conflict ("nombre") do update set "ultima_ejecucion" = excluded."ultima_ejecucion"
+    where t."ultima_ejecucion" <= now() - make_interval(secs => p_intervalo)
+    returning t."ultima_ejecucion";
+$$;
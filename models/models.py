@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from datetime import datetime
+from pydantic import BaseModel, Field, validator
+from datetime import date, datetime, time
 from typing import Optional
 
 class Mascota(BaseModel):
@@ -24,6 +24,19 @@ class Cita(BaseModel):
     id_veterinario: int
     hora_cita: str
 
+    @validator("fecha_cita")
+    def fecha_valida(cls, value: str) -> str:
+        # Se normaliza a AAAA-MM-DD: el índice de disponibilidad agrupa por la fecha tal cual
+        return date.fromisoformat(value).isoformat()
+
+    @validator("hora_cita")
+    def hora_valida(cls, value: str) -> str:
+        # Se normaliza a HH:MM: "09:00" y "09:00:00" son la misma hora para la agenda
+        hora = time.fromisoformat(value)
+        if hora.tzinfo is not None:
+            raise ValueError("La hora no lleva zona horaria")
+        return hora.isoformat(timespec="minutes")
+
 class Diagnostico(BaseModel):
     id: Optional[int]
     id_cita: int
@@ -39,6 +52,19 @@ class Funcionario(BaseModel):
     class Config:
         fields = {'nombre': 'nombre'}
 
+class Principal(BaseModel):
+    """Usuario autenticado, tal como viene en el token JWT."""
+    sub: str
+    role: str
+    nombre: Optional[str]
+    client_id: Optional[int]  # solo clientes
+    id: Optional[int]  # solo funcionarios
+    exp: int
+
+    @property
+    def is_cliente(self) -> bool:
+        return self.role == "cliente"
+
 class LoginRequest(BaseModel):
     correo: str
     contraseña: str
@@ -49,6 +75,9 @@ class CompleteCitaData(BaseModel):
     motivo: str
     resultado: str
 
+class CompletarCitaItem(CompleteCitaData):
+    id_cita: int
+
 class AssociatePetVaccineRequest(BaseModel):
     mascota_id: int
     vacuna_id: int
\ No newline at end of file
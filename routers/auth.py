@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
 from datetime import timedelta
-from core.security import create_access_token, verify_password
+from core.security import create_access_token, hash_password_async, password_needs_rehash, verify_password_async
 from models.models import LoginRequest
-from db.supabase_client import supabase
+from db.repository import db
 from core.config import settings
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -10,14 +10,22 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 @router.post("/login/")
 async def login_user(login_data: LoginRequest):
     table = "Clientes" if login_data.role == "cliente" else "Funcionario"
-    response = supabase.table(table).select("*").eq("correo", login_data.correo).execute()
+    response = await db.select(table, filters=[("correo", "eq", login_data.correo)])
     if not response.data:
         raise HTTPException(status_code=400, detail="Correo o contraseña incorrectos")
 
     user = response.data[0]
-    if not verify_password(login_data.contraseña, user["contraseña"]):
+    if not await verify_password_async(login_data.contraseña, user["contraseña"]):
         raise HTTPException(status_code=400, detail="Correo o contraseña incorrectos")
 
+    # Si el hash se generó con otro factor de coste, se actualiza con el configurado
+    if password_needs_rehash(user["contraseña"]):
+        try:
+            nuevo_hash = await hash_password_async(login_data.contraseña)
+            await db.update(table, {"contraseña": nuevo_hash}, filters=[("id", "eq", user["id"])])
+        except Exception:
+            pass  # el rehash es oportunista; no debe impedir el inicio de sesión
+
     # Generar token JWT con el rol del usuario
     if table == "Clientes":
         token = create_access_token(
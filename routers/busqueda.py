@@ -0,0 +1,31 @@
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
+from core.config import settings
+from core.security import get_principal
+from models.models import Principal
+from services import busqueda as busqueda_service
+
+router = APIRouter(prefix="/buscar", tags=["busqueda"])
+
+@router.get("/")
+@router.get("", include_in_schema=False)
+async def buscar(
+    q: str = Query(..., min_length=1, max_length=100),
+    tipo: Optional[List[str]] = Query(None, description="mascota, cliente y/o funcionario (por defecto, todos)"),
+    limit: int = Query(20, ge=1, le=settings.BUSQUEDA_MAX_RESULTADOS),
+    principal: Principal = Depends(get_principal),
+):
+    """
+    Busca mascotas, clientes y funcionarios por nombre o correo (también por fragmentos).
+    Solo para el personal de la clínica: los resultados incluyen correos de otros clientes.
+    """
+    if principal.is_cliente:
+        raise HTTPException(status_code=403, detail="La búsqueda solo está disponible para funcionarios")
+    tipos = tipo or list(busqueda_service.TIPOS)
+    desconocidos = [t for t in tipos if t not in busqueda_service.TIPOS]
+    if desconocidos:
+        raise HTTPException(status_code=400, detail=f"Tipo no válido: {', '.join(desconocidos)}")
+    try:
+        return {"data": await busqueda_service.buscar(q, limit, tipos)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,22 +1,44 @@
+from contextlib import AsyncExitStack
+from datetime import date
+from typing import List
 from fastapi import APIRouter, HTTPException, Depends
-from models.models import Cita, CompleteCitaData
-from db.supabase_client import supabase
+from models.models import Cita, CompleteCitaData, CompletarCitaItem
+from core.config import settings
+from db.repository import db, error_message, is_conflict
 from core.security import verify_token
+from core.cache import cache
+from core.pagination import Page, paginate
+from core.responses import FastJSONResponse
+from services import citas as citas_service
+from services.bulk import check_batch_size, insert_rows, summary, validate_items
+from services.disponibilidad import index as disponibilidad
 
 router = APIRouter(prefix="/citas", tags=["citas"])
 
 @router.get("/", dependencies=[Depends(verify_token)])
-async def get_citas():
+async def get_citas(page: Page = Depends()):
     try:
-        response = supabase.table("Citas").select("*").execute()
-        return {"data": response.data}
+        return FastJSONResponse(await paginate("Citas", page))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/disponibilidad", dependencies=[Depends(verify_token)])
+async def get_disponibilidad(veterinario: int, fecha: date):
+    """
+    Horas ocupadas y huecos libres de un veterinario en un día.
+    :param veterinario: ID del veterinario.
+    :param fecha: Fecha en el mismo formato que fecha_cita (AAAA-MM-DD).
+    """
+    try:
+        fecha = fecha.isoformat()
+        return {"data": {"veterinario": veterinario, "fecha": fecha, **await disponibilidad.availability(veterinario, fecha)}}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{id}", dependencies=[Depends(verify_token)])
 async def get_citas_mascota(id: int):
     try:
-        response = supabase.table("Citas").select("*").eq("id_mascota", id).execute()
+        response = await db.select("Citas", filters=[("id_mascota", "eq", id)])
         return {"data": response.data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -26,71 +48,103 @@ async def get_citas_mascota(id: int):
 @router.get("/{id}/fecha", dependencies=[Depends(verify_token)])
 async def get_citas_fecha(id: int):
     try:
-        response = supabase.table("Citas").select("*").eq("id", id).execute()
+        response = await db.select("Citas", filters=[("id", "eq", id)])
         return {"data": response.data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 @router.get("/veterinario/{id}", dependencies=[Depends(verify_token)])
-async def get_citas_veterinario(id: int):
+async def get_citas_veterinario(id: int, page: Page = Depends()):
     try:
-        response = supabase.table("Historial").select("*").eq("veterinario_id", id).execute()
-        return {"data": response.data}
+        return FastJSONResponse(await paginate("Historial", page, filters=[("veterinario_id", "eq", id)]))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/", dependencies=[Depends(verify_token)])
 async def create_cita(cita: Cita):
     try:
-        response = supabase.table("Citas").insert(cita.dict()).execute()
+        async with disponibilidad.lock(cita.id_veterinario, cita.fecha_cita):
+            # El día se relee: otro worker puede haber dado una cita desde que se cargó
+            await disponibilidad.reload(cita.id_veterinario, cita.fecha_cita)
+            choque = await disponibilidad.conflict(cita.id_veterinario, cita.fecha_cita, cita.hora_cita)
+            if choque is not None:
+                raise HTTPException(status_code=409, detail=f"El veterinario ya tiene una cita a las {choque} ese día")
+            response = await db.insert("Citas", cita.dict())
+            for nueva in response.data:
+                disponibilidad.add(nueva)
+        cache.invalidate("dashboard")
         return {"message": "Cita creada", "data": response.data}
+    except HTTPException:
+        raise
     except Exception as e:
+        if is_conflict(e):
+            # Otro worker ocupó el hueco entre la lectura y la inserción (trigger de db/sql/citas_sin_solapamiento.sql)
+            raise HTTPException(status_code=409, detail=error_message(e))
         raise HTTPException(status_code=500, detail=str(e))
     
-@router.post("/{id_cita}/completar", dependencies=[Depends(verify_token)])
-async def completar_cita(id_cita: int, data: CompleteCitaData):
+@router.post("/lote", dependencies=[Depends(verify_token)])
+async def create_citas(citas: List[dict]):
+    check_batch_size(citas)
     try:
-        # Obtenenemos la cita
-        cita_response = supabase.table("Citas").select("*").eq("id", id_cita).execute()
-        
-        if not cita_response.data:
-            raise HTTPException(status_code=404, detail="Cita no encontrada")
-
-        cita = cita_response.data[0]
-
-        # Preparar datos para insertar en Historial usando los datos proporcionados
-        historial_data = {
-            "id_mascota": cita["id_mascota"],
-            "fecha": cita["fecha_cita"],
-            "tipo": data.tipo,
-            "descripcion": data.motivo,
-            "veterinario_id": cita["id_veterinario"],
-            "resultado": data.resultado
-        }
-
-        # Insertar la cita en el historial
-        historial_response = supabase.table("Historial").insert(historial_data).execute()
-        
-        if not historial_response.data:
-            raise HTTPException(status_code=500, detail="No se pudo registrar la cita en el historial")
-
-        # Eliminar la cita de la tabla de citas
-        delete_response = supabase.table("Citas").delete().eq("id", id_cita).execute()
-        
-        if not delete_response.data:
-            raise HTTPException(status_code=500, detail="No se pudo eliminar la cita de la tabla de citas")
+        resultados, validas = validate_items(citas, Cita)
+        filas = []
+        async with AsyncExitStack() as stack:
+            # Mismos locks por veterinario y día que POST /citas/, tomados en orden para no bloquearse con otro lote
+            for veterinario, fecha in sorted({(cita.id_veterinario, cita.fecha_cita) for _, cita in validas}):
+                await stack.enter_async_context(disponibilidad.lock(veterinario, fecha))
+                await disponibilidad.reload(veterinario, fecha)
+            try:
+                for index, cita in validas:
+                    choque = await disponibilidad.conflict(cita.id_veterinario, cita.fecha_cita, cita.hora_cita)
+                    if choque is not None:
+                        resultados[index] = {"index": index, "ok": False, "error": f"El veterinario ya tiene una cita a las {choque} ese día"}
+                        continue
+                    fila = cita.dict()
+                    disponibilidad.add(fila)  # reserva el hueco para las siguientes filas del lote
+                    filas.append((index, fila))
+                await insert_rows("Citas", filas, resultados)
+            finally:
+                # Se liberan los huecos reservados que no se insertaron, también si el lote falló a medias
+                for index, fila in filas:
+                    if not (resultados[index] or {}).get("ok"):
+                        disponibilidad.remove(fila)
+        if any(r["ok"] for r in resultados):
+            cache.invalidate("dashboard")
+        return summary(resultados)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        return {"message": "Cita completada y movida al historial exitosamente"}
+@router.post("/completar", dependencies=[Depends(verify_token)])
+async def completar_citas(citas: List[CompletarCitaItem]):
+    if len(citas) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Máximo {settings.BULK_MAX_ITEMS} citas por petición")
+    try:
+        resultados = await citas_service.completar_citas(citas)
+        completadas = sum(1 for r in resultados if r["ok"])
+        return {"message": f"{completadas} de {len(resultados)} citas completadas", "data": resultados}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ocurrió un error: {str(e)}")
 
+@router.post("/{id_cita}/completar", dependencies=[Depends(verify_token)])
+async def completar_cita(id_cita: int, data: CompleteCitaData):
+    try:
+        # Borra la cita y la registra en el historial en una sola transacción
+        resultado = await citas_service.completar_cita(id_cita, data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ocurrió un error: {str(e)}")
+    if not resultado["ok"]:
+        raise HTTPException(status_code=404, detail="Cita no encontrada")
+    return {"message": "Cita completada y movida al historial exitosamente"}
 
 @router.delete("/{id_cita}/cancelar", dependencies=[Depends(verify_token)])
 async def cancelar_cita(id_cita: int):
     try:
-        response = supabase.table("Citas").delete().eq("id", id_cita).execute()
+        response = await db.delete("Citas", filters=[("id", "eq", id_cita)])
         if not response.data:
             raise HTTPException(status_code=404, detail="Cita no encontrada o no pudo ser cancelada")
+        for cancelada in response.data:
+            disponibilidad.remove(cancelada)
+        cache.invalidate("dashboard")
         return {"message": "Cita cancelada exitosamente", "data": response.data}
     except Exception as e:
         raise HTTPException(status_code=500, detail="Ocurrió un error al cancelar la cita.")
@@ -1,27 +1,40 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from models.models import Cliente
-from db.supabase_client import supabase
-from core.security import hash_password
+from db.repository import db
+from core.security import hash_password_async
+from core.cache import cache
+from core.pagination import Page, paginate
+from core.responses import FastJSONResponse
 import random
 
 router = APIRouter(prefix="/clientes", tags=["clientes"])
 
+# Columnas públicas de Clientes (nunca se devuelve la contraseña)
+CLIENTE_FIELDS = ("id", "nombre_usuario", "correo")
+
 @router.get("/")
-async def get_clientes():
+async def get_clientes(page: Page = Depends()):
     try:
-        response = supabase.table("Clientes").select("id, nombre_usuario, correo").execute()
-        return {"data": response.data}
+        return FastJSONResponse(await cache.get_or_load(
+            page.cache_key("clientes"),
+            lambda: paginate("Clientes", page, default_columns=", ".join(CLIENTE_FIELDS), allowed_fields=CLIENTE_FIELDS),
+        ))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/agregar")
 async def create_cliente(cliente: Cliente):
     try:
-        hashed_password = hash_password(cliente.contraseña)
+        hashed_password = await hash_password_async(cliente.contraseña)
         cliente_data = cliente.dict()
         cliente_data["contraseña"] = hashed_password
-        response = supabase.table("Clientes").insert(cliente_data).execute()
+        response = await db.insert("Clientes", cliente_data)
+        cache.invalidate("clientes", "dashboard")
         return {"message": "Cliente creado", "data": response.data}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
\ No newline at end of file
@@ -1,48 +1,71 @@
-from fastapi import APIRouter, HTTPException, Depends
-from db.supabase_client import supabase
+import asyncio
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
+from db.repository import db
 from core.security import verify_token
+from core.cache import cache
+from services import analytics
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
-@router.get("/")
-async def get_dashboard_data():
-    try:
-        # Total de citas programadas, realizadas y pendientes
-        citas = supabase.table("Citas").select("*").execute().data
-        revisadas = supabase.table("Historial").select("*").execute().data
-        total_citas = len(citas)
-        total_revisadas = len(revisadas)
-        citas_pendientes = total_revisadas - total_citas
+async def _load_dashboard_data():
+    # Conteos en el servidor (sin descargar filas) y agrupación por veterinario, en paralelo
+    (
+        total_citas,
+        total_revisadas,
+        total_clientes,
+        total_funcionarios,
+        total_mascotas,
+        por_veterinario,
+    ) = await asyncio.gather(
+        db.count("Citas"),
+        db.count("Historial"),
+        db.count("Clientes"),
+        db.count("Funcionario"),
+        db.count("Mascotas"),
+        db.rpc("citas_por_veterinario", read_only=True),
+    )
 
-        # Total de clientes y funcionarios
-        total_clientes = len(supabase.table("Clientes").select("*").execute().data)
-        total_funcionarios = len(supabase.table("Funcionario").select("*").execute().data)
-        usuarios_activos = total_clientes + total_funcionarios
+    # Total de citas programadas, realizadas y pendientes
+    citas_pendientes = total_revisadas - total_citas
 
-        # Total de mascotas
-        total_mascotas = len(supabase.table("Mascotas").select("*").execute().data)
+    # Total de clientes y funcionarios
+    usuarios_activos = total_clientes + total_funcionarios
 
-        # Promedio de citas por veterinario
-        citas_por_veterinario = {}
-        for cita in citas:
-            vet_id = cita.get("id_veterinario")
-            if vet_id:
-                citas_por_veterinario[vet_id] = citas_por_veterinario.get(vet_id, 0) + 1
-        promedio_citas_veterinario = sum(citas_por_veterinario.values()) / len(citas_por_veterinario) if citas_por_veterinario else 0
+    # Promedio de citas por veterinario
+    citas_por_veterinario = {
+        fila["id_veterinario"]: fila["total"] for fila in por_veterinario.data if fila["id_veterinario"]
+    }
+    promedio_citas_veterinario = sum(citas_por_veterinario.values()) / len(citas_por_veterinario) if citas_por_veterinario else 0
 
-        return {
-            "appointment_stats": {
-                "scheduled": total_citas,
-                "completed": total_revisadas,
-                "pending": citas_pendientes,
-            },
-            "active_users": {
-                "clients": total_clientes,
-                "staff": total_funcionarios,
-                "total": usuarios_activos,
-            },
-            "total_pets": total_mascotas,
-            "avg_appointments_per_vet": promedio_citas_veterinario,
-        }
+    return {
+        "appointment_stats": {
+            "scheduled": total_citas,
+            "completed": total_revisadas,
+            "pending": citas_pendientes,
+        },
+        "active_users": {
+            "clients": total_clientes,
+            "staff": total_funcionarios,
+            "total": usuarios_activos,
+        },
+        "total_pets": total_mascotas,
+        "avg_appointments_per_vet": promedio_citas_veterinario,
+    }
+@router.get("/")
+async def get_dashboard_data():
+    try:
+        return await cache.get_or_load("dashboard", _load_dashboard_data)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener los datos del dashboard: {e}")
+
+@router.get("/analytics")
+async def get_analytics(desde: Optional[date] = Query(None), hasta: Optional[date] = Query(None)):
+    # Visitas por mes, veterinario, especie y resultado, calculadas desde los agregados
+    if desde and hasta and desde > hasta:
+        raise HTTPException(status_code=400, detail="'desde' no puede ser posterior a 'hasta'")
+    try:
+        return await analytics.resumen(desde.isoformat() if desde else None, hasta.isoformat() if hasta else None)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al obtener los datos del dashboard: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error al obtener las estadísticas: {e}")
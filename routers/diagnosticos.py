@@ -1,14 +1,17 @@
 from fastapi import APIRouter, HTTPException, Depends
 from models.models import Diagnostico, CompleteCitaData
-from db.supabase_client import supabase
+from db.repository import db
 from core.security import verify_token
+from core.pagination import Page, paginate
+from core.responses import FastJSONResponse
+from services import citas as citas_service
 
 router = APIRouter(prefix="/diagnosticos", tags=["diagnosticos"])
 
 @router.post("/", dependencies=[Depends(verify_token)])
 async def create_diagnostico(diagnostico: Diagnostico):
     try:
-        response = supabase.table("Diagnosticos").insert(diagnostico.dict()).execute()
+        response = await db.insert("Diagnosticos", diagnostico.dict())
         return {"message": "Diagnóstico creado", "data": response.data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -16,32 +19,16 @@ async def create_diagnostico(diagnostico: Diagnostico):
 @router.post("/citas/{id_cita}/completar", dependencies=[Depends(verify_token)])
 async def completar_cita(id_cita: int, data: CompleteCitaData):
     try:
-        cita_response = supabase.table("Citas").select("*").eq("id", id_cita).execute()
-        if not cita_response.data:
-            raise HTTPException(status_code=404, detail="Cita no encontrada")
-        cita = cita_response.data[0]
-        historial_data = {
-            "id_mascota": cita["id_mascota"],
-            "fecha": cita["fecha_cita"],
-            "tipo": data.tipo,
-            "descripcion": data.motivo,
-            "veterinario_id": cita["id_veterinario"],
-            "resultado": data.resultado
-        }
-        historial_response = supabase.table("Historial").insert(historial_data).execute()
-        if not historial_response.data:
-            raise HTTPException(status_code=500, detail="No se pudo registrar la cita en el historial")
-        delete_response = supabase.table("Citas").delete().eq("id", id_cita).execute()
-        if not delete_response.data:
-            raise HTTPException(status_code=500, detail="No se pudo eliminar la cita de la tabla de citas")
-        return {"message": "Cita completada y movida al historial exitosamente"}
+        resultado = await citas_service.completar_cita(id_cita, data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if not resultado["ok"]:
+        raise HTTPException(status_code=404, detail="Cita no encontrada")
+    return {"message": "Cita completada y movida al historial exitosamente"}
     
 @router.get("/historial/{id_mascota}", dependencies=[Depends(verify_token)])
-async def get_historial_mascota(id_mascota: int):
+async def get_historial_mascota(id_mascota: int, page: Page = Depends()):
     try:
-        response = supabase.table("Historial").select("*").eq("id_mascota", id_mascota).execute()
-        return {"data": response.data}
+        return FastJSONResponse(await paginate("Historial", page, filters=[("id_mascota", "eq", id_mascota)]))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,50 @@
+import csv
+import io
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from core.config import settings
+from core.pagination import iter_pages
+from core.responses import dumps
+from core.security import verify_token
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+# recurso de la URL -> tabla
+EXPORTABLE = {"historial": "Historial", "citas": "Citas", "mascotas": "Mascotas"}
+
+async def _ndjson(table: str):
+    async for rows in iter_pages(table, page_size=settings.EXPORT_PAGE_SIZE):
+        yield b"".join(dumps(row) + b"\n" for row in rows)
+
+async def _csv(table: str):
+    columns = None
+    async for rows in iter_pages(table, page_size=settings.EXPORT_PAGE_SIZE):
+        buffer = io.StringIO()
+        if columns is None:
+            columns = list(rows[0].keys())
+            writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+        else:
+            writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+
+@router.get("/{recurso}", dependencies=[Depends(verify_token)])
+async def export_recurso(recurso: str, formato: str = Query("ndjson", regex="^(ndjson|csv)$")):
+    """
+    Exporta una tabla completa en streaming, página a página, sin cargarla en memoria.
+    :param recurso: historial, citas o mascotas.
+    :param formato: ndjson (una fila JSON por línea) o csv.
+    """
+    table = EXPORTABLE.get(recurso)
+    if table is None:
+        raise HTTPException(status_code=404, detail=f"No se puede exportar '{recurso}'")
+    if formato == "csv":
+        body, media_type = _csv(table), "text/csv"
+    else:
+        body, media_type = _ndjson(table), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{recurso}.{formato}"'},
+    )
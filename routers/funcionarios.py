@@ -1,15 +1,17 @@
 from fastapi import APIRouter, HTTPException, Depends
 from models.models import Funcionario
-from db.supabase_client import supabase
-from core.security import hash_password, verify_token
+from db.repository import db
+from core.security import hash_password_async, verify_token
+from core.cache import cache
+from core.pagination import Page, paginate
+from core.responses import FastJSONResponse
 
 router = APIRouter(prefix="/funcionarios", tags=["funcionarios"])
 
 @router.get("/", dependencies=[Depends(verify_token)])
-async def get_funcionarios():
+async def get_funcionarios(page: Page = Depends()):
     try:
-        response = supabase.table("Funcionario").select("*").execute()
-        return {"data": response.data}
+        return FastJSONResponse(await cache.get_or_load(page.cache_key("funcionarios"), lambda: paginate("Funcionario", page)))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -17,11 +19,14 @@ async def get_funcionarios():
 async def create_funcionario(funcionario: Funcionario):
     try:
         
-        hashed_password = hash_password(funcionario.contraseña)
+        hashed_password = await hash_password_async(funcionario.contraseña)
         funcionario_data = funcionario.dict()
         funcionario_data["contraseña"] = hashed_password
-        response = supabase.table("Funcionario").insert(funcionario_data).execute()
+        response = await db.insert("Funcionario", funcionario_data)
+        cache.invalidate("funcionarios", "dashboard")
         return {"message": "Funcionario creado", "data": response.data}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
@@ -29,7 +34,7 @@ async def create_funcionario(funcionario: Funcionario):
 @router.get("/{id}", dependencies=[Depends(verify_token)])
 async def get_funcionario(id: int):
     try:
-        response = supabase.table("Funcionario").select("*").eq("id", id).execute()
+        response = await db.select("Funcionario", filters=[("id", "eq", id)])
         if not response.data:
             raise HTTPException(status_code=404, detail="Funcionario no encontrado")
         return {"data": response.data}
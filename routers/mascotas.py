@@ -1,30 +1,55 @@
+import asyncio
+from typing import List
 from fastapi import APIRouter, HTTPException, Depends
-from models.models import Mascota
-from db.supabase_client import supabase
-from core.security import verify_token
+from models.models import Mascota, Principal
+from core.config import settings
+from db.repository import db
+from core.security import get_principal, verify_token
+from core.cache import cache
+from core.tasks import tasks
+from core.pagination import Page, paginate
+from core.responses import FastJSONResponse
+from services.bulk import check_batch_size, insert_in_chunks, summary
+from services import vacunas as vacunas_service
+from services.vacunas_pendientes import pendientes
 
 router = APIRouter(prefix="/mascotas", tags=["mascotas"])
 
 @router.get("/", dependencies=[Depends(verify_token)])
-async def get_mascotas():
+async def get_mascotas(page: Page = Depends()):
     try:
-        response = supabase.table("Mascotas").select("*").execute()
-        return {"data": response.data}
+        return FastJSONResponse(await paginate("Mascotas", page))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/", dependencies=[Depends(verify_token)])
 async def create_mascota(mascota: Mascota):
     try:
-        response = supabase.table("Mascotas").insert(mascota.dict()).execute()
+        response = await db.insert("Mascotas", mascota.dict())
+        cache.invalidate("dashboard", "mascotas")
+        await tasks.submit("vacunas_pendientes.refresh", pendientes.refresh, [row["id"] for row in response.data])
         return {"message": "Mascota creada", "data": response.data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/lote", dependencies=[Depends(verify_token)])
+async def create_mascotas(mascotas: List[dict]):
+    check_batch_size(mascotas)
+    try:
+        resultados = await insert_in_chunks("Mascotas", mascotas, Mascota)
+        if any(r["ok"] for r in resultados):
+            cache.invalidate("dashboard", "mascotas")
+            await tasks.submit("vacunas_pendientes.refresh", pendientes.refresh, [r["data"]["id"] for r in resultados if r["ok"]])
+        return summary(resultados)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.put("/{id}/editar", dependencies=[Depends(verify_token)])
 async def update_mascota(id: int, mascota: Mascota):
     try:
-        response = supabase.table("Mascotas").update(mascota.dict()).eq("id", id).execute()
+        response = await db.update("Mascotas", mascota.dict(), filters=[("id", "eq", id)])
+        cache.invalidate("mascotas")
+        await tasks.submit("vacunas_pendientes.refresh", pendientes.refresh, [id])
         return {"message": "Mascota actualizada", "data": response.data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -37,7 +62,7 @@ async def get_mascotas_by_dueno(dueno_id: int):
     :return: Lista de mascotas asociadas al dueño.
     """
     try:
-        response = supabase.table("Mascotas").select("*").eq("id_dueño", dueno_id).execute()
+        response = await db.select("Mascotas", filters=[("id_dueño", "eq", dueno_id)])
         if not response.data:
             raise HTTPException(status_code=404, detail="No se encontraron mascotas para este dueño.")
         return {"data": response.data}
@@ -47,9 +72,36 @@ async def get_mascotas_by_dueno(dueno_id: int):
 @router.get("/{id}", dependencies=[Depends(verify_token)])
 async def get_mascota(id: int):
     try:
-        response = supabase.table("Mascotas").select("*").eq("id", id).execute()
+        response = await db.select("Mascotas", filters=[("id", "eq", id)])
         if not response.data:
             raise HTTPException(status_code=404, detail="Mascota no encontrada")
         return {"data": response.data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{id}/perfil")
+async def get_perfil_mascota(id: int, principal: Principal = Depends(get_principal)):
+    """
+    Obtiene en una sola llamada la mascota, sus citas, su historial (las entradas más recientes) y sus vacunas.
+    Las cuatro consultas se hacen en paralelo. Un cliente solo puede ver el perfil de sus propias mascotas.
+    :param id: ID de la mascota.
+    """
+    try:
+        mascota, citas, historial, vacunas = await asyncio.gather(
+            db.select("Mascotas", filters=[("id", "eq", id)]),
+            db.select("Citas", filters=[("id_mascota", "eq", id)]),
+            db.select("Historial", filters=[("id_mascota", "eq", id)], order="id", desc=True, limit=settings.PAGE_DEFAULT_LIMIT),
+            db.select("VacunasMascotas", filters=[("mascota", "eq", id)]),
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not mascota.data:
+        raise HTTPException(status_code=404, detail="Mascota no encontrada")
+    if principal.is_cliente and mascota.data[0].get("id_dueño") != principal.client_id:
+        raise HTTPException(status_code=403, detail="No tienes permiso para ver esta mascota")
+    return FastJSONResponse({"data": {
+        "mascota": mascota.data[0],
+        "citas": citas.data,
+        "historial": historial.data,
+        "vacunas": await vacunas_service.with_details(vacunas.data),
+    }})
@@ -1,33 +1,132 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from db.supabase_client import supabase
+import asyncio
+import os
+from fastapi import APIRouter, HTTPException, Request
+from starlette.datastructures import UploadFile
+from core.cache import cache
+from core.config import settings
+from core.images import make_thumbnails, sniff_image_type, thumbnail_executor, thumbnail_path, thumbnails_enabled
+from core.tasks import tasks
+from db.repository import db
 
 router = APIRouter(prefix="/upload", tags=["upload"])
 
-@router.post("/mascota-image/{mascota_id}")
-async def upload_mascota_image(mascota_id: int, file: UploadFile = File(...)):
+# Margen para los delimitadores y cabeceras del multipart sobre el tamaño máximo de la imagen
+_MULTIPART_OVERHEAD = 16 * 1024
+
+def _too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"La imagen supera el máximo de {settings.UPLOAD_MAX_BYTES} bytes")
+
+def _limited_receive(request: Request, max_body: int):
+    """``receive`` que corta la petición en cuanto el cuerpo supera ``max_body`` (también sin Content-Length)."""
+    received = 0
+
+    async def receive():
+        nonlocal received
+        message = await request.receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_body:
+                raise _too_large()
+        return message
+
+    return receive
+
+async def _read_image(request: Request):
+    """
+    Lee el formulario multipart rechazando lo que exceda ``UPLOAD_MAX_BYTES`` antes
+    de recibirlo entero. Devuelve el formulario (hay que cerrarlo), el archivo y su content-type.
+    """
+    max_body = settings.UPLOAD_MAX_BYTES + _MULTIPART_OVERHEAD
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_body:
+        raise _too_large()
+    try:
+        form = await Request(request.scope, _limited_receive(request, max_body)).form()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Formulario multipart inválido: {str(e)}")
+    try:
+        file = form.get("file")
+        if not isinstance(file, UploadFile):
+            raise HTTPException(status_code=422, detail="Falta el archivo (campo 'file')")
+        content_type = sniff_image_type(await file.read(16))
+        file.file.seek(0, os.SEEK_END)
+        size = file.file.tell()
+        await file.seek(0)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="El archivo está vacío")
+        if size > settings.UPLOAD_MAX_BYTES:
+            raise _too_large()
+        if content_type is None:
+            raise HTTPException(status_code=415, detail="El archivo no es una imagen JPEG, PNG, GIF o WebP")
+    except BaseException:
+        await form.close()
+        raise
+    return form, file, content_type
+
+async def _save_image_url(mascota_id: int, image_url: str):
+    await db.update("Mascotas", {"image_url": image_url}, filters=[("id", "eq", mascota_id)])
+    cache.invalidate("mascotas")
+    print("Imagen actualizada")
+
+async def _generate_thumbnails(source: UploadFile, file_path: str):
+    # La generación se intenta una sola vez (el archivo temporal se cierra al terminar);
+    # cada subida es una tarea aparte, con sus propios reintentos
     try:
-        # Read the file safely
-        file_data = await file.read()
+        loop = asyncio.get_running_loop()
+        thumbnails = await loop.run_in_executor(thumbnail_executor, make_thumbnails, source.file, settings.THUMBNAIL_SIZES)
+    finally:
+        await source.close()
+    for size, data in thumbnails.items():
+        await tasks.submit("subir_miniatura", db.upload, "images", thumbnail_path(file_path, size), data, "image/webp")
+
+# El cuerpo se lee a mano (sin File(...)) para poder cortarlo por tamaño mientras llega
+_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["file"],
+            "properties": {"file": {"type": "string", "format": "binary"}},
+        }}},
+    },
+}
 
-        # Proceed with the upload in storage
-        file_path = f"mascotas/{mascota_id}/{file.filename}"
-        response = supabase.storage.from_("images").upload(file_path, file_data)
+@router.post("/mascota-image/{mascota_id}", openapi_extra=_UPLOAD_BODY)
+async def upload_mascota_image(mascota_id: int, request: Request):
+    form = None
+    keep_file = False
+    try:
+        # Size limit and real content type are enforced while the body is received
+        form, file, content_type = await _read_image(request)
 
-        # Check for errors in the response
-        if response.error:
-            error_message = response.error.message
-            raise HTTPException(status_code=400, detail=f"Error uploading image: {error_message}")
+        # Proceed with the upload in storage (streamed from the spooled upload file)
+        file_path = f"mascotas/{mascota_id}/{os.path.basename(file.filename)}"
+        await db.upload("images", file_path, file.file, content_type)
 
         # Generate public URL for the image
-        image_url = supabase.storage.from_("images").get_public_url(file_path)
+        image_url = db.public_url("images", file_path)
 
-        # Update the image URL in the database
-        supabase.table("Mascotas").update({"image_url": image_url}).eq("id", mascota_id).execute()
-        print("Imagen actualizada")
+        # The image URL in the database and the thumbnails are updated by the task queue
+        await tasks.submit("actualizar_imagen_mascota", _save_image_url, mascota_id, image_url)
+        thumbnails = {}
+        if thumbnails_enabled():
+            keep_file = True
+            await tasks.submit("generar_miniaturas", _generate_thumbnails, file, file_path, max_attempts=1)
+            thumbnails = {
+                str(size): db.public_url("images", thumbnail_path(file_path, size))
+                for size in settings.THUMBNAIL_SIZES
+            }
 
-        return {"message": "Imagen subida correctamente", "image_url": image_url}
+        return {"message": "Imagen subida correctamente", "image_url": image_url, "thumbnails": thumbnails}
 
+    except HTTPException:
+        raise
     except Exception as e:
         # Log the exact error for debugging
         print(f"Error en upload_mascota_image: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+    finally:
+        if form is not None and not keep_file:
+            await form.close()
@@ -1,15 +1,42 @@
-from fastapi import APIRouter, HTTPException, Depends
+from datetime import date, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
-from db.supabase_client import supabase
+from db.repository import db
 from core.security import verify_token
+from core.cache import cache
+from core.config import settings
+from core.tasks import tasks
+from core.pagination import Page, paginate
+from core.responses import FastJSONResponse
+from services.bulk import check_batch_size, insert_in_chunks, summary
+from services import vacunas as vacunas_service
+from services.vacunas_pendientes import pendientes
 from models.models import AssociatePetVaccineRequest
 
 router = APIRouter(prefix="/vacunas", tags=["vacunas"])
 
+# Declarada antes de /{id_vacuna} para que "pendientes" no se tome como un id
+@router.get("/pendientes", dependencies=[Depends(verify_token)])
+async def get_vacunas_pendientes(
+    page: Page = Depends(),
+    hasta: Optional[date] = Query(None, description=f"Por defecto, hoy + {settings.VACUNAS_AVISO_DIAS} días"),
+    desde: Optional[date] = Query(None, description="Omitir para incluir también las dosis vencidas"),
+):
+    """Próximas dosis de refuerzo por mascota y vacuna, leídas de la tabla que se calcula en segundo plano."""
+    hasta = hasta or date.today() + timedelta(days=settings.VACUNAS_AVISO_DIAS)
+    filters = [("proxima_dosis", "lte", hasta.isoformat())]
+    if desde:
+        filters.append(("proxima_dosis", "gte", desde.isoformat()))
+    try:
+        return FastJSONResponse(await paginate("VacunasPendientes", page, filters))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/{id_vacuna}", dependencies=[Depends(verify_token)])
 async def get_vacuna(id_vacuna: int):
     try:
-        response = supabase.table("Vacunas").select("*").eq("id", id_vacuna).execute()
+        response = await db.select("Vacunas", filters=[("id", "eq", id_vacuna)])
         return {"data": response.data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -17,8 +44,9 @@ async def get_vacuna(id_vacuna: int):
 @router.get("/mascotas/{id_mascota}", dependencies=[Depends(verify_token)])
 async def get_vacunas_mascota(id_mascota: int):
     try:
-        response = supabase.from_("VacunasMascotas").select("*").filter("mascota", "eq", id_mascota).execute()
-        return {"data": response.data}
+        response = await db.select("VacunasMascotas", filters=[("mascota", "eq", id_mascota)])
+        # Los datos de cada vacuna vienen del catálogo en memoria, sin una consulta por fila
+        return FastJSONResponse({"data": await vacunas_service.with_details(response.data)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -29,17 +57,46 @@ async def associate_pet_vaccine(request: AssociatePetVaccineRequest):
             "mascota": request.mascota_id,
             "vacuna": request.vacuna_id
         }
-        response = supabase.table("VacunasMascotas").insert(data).execute()
+        response = await db.insert("VacunasMascotas", data)
         if not response.data:
             raise HTTPException(status_code=500, detail="No se pudo asociar la vacuna a la mascota.")
+        cache.invalidate("vacunas")
+        await tasks.submit("vacunas_pendientes.refresh", pendientes.refresh, [request.mascota_id])
         return {"message": "Mascota y vacuna asociadas correctamente", "data": response.data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/asociar/lote", dependencies=[Depends(verify_token)])
+async def associate_pet_vaccines(asociaciones: List[dict]):
+    check_batch_size(asociaciones)
+    try:
+        resultados = await insert_in_chunks(
+            "VacunasMascotas",
+            asociaciones,
+            AssociatePetVaccineRequest,
+            lambda request: {"mascota": request.mascota_id, "vacuna": request.vacuna_id},
+        )
+        if any(r["ok"] for r in resultados):
+            cache.invalidate("vacunas")
+            await tasks.submit(
+                "vacunas_pendientes.refresh", pendientes.refresh, sorted({r["data"]["mascota"] for r in resultados if r["ok"]}),
+            )
+        return summary(resultados)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/", dependencies=[Depends(verify_token)])
-async def get_all_vacunas():
+@router.get("", dependencies=[Depends(verify_token)], include_in_schema=False)  # /vacunas?ids=... sin redirección
+async def get_all_vacunas(
+    page: Page = Depends(),
+    ids: Optional[str] = Query(None, regex=r"^\d+(,\d+)*$", description="Ids separados por comas, por ejemplo 1,2,3"),
+):
     try:
-        response = supabase.table("Vacunas").select("*").execute()
-        return {"data": response.data}
+        if ids:
+            # Búsqueda por lote desde el catálogo, en el orden pedido
+            requested = [int(i) for i in ids.split(",")]
+            vacunas = await vacunas_service.resolve(requested)
+            return FastJSONResponse({"data": [vacunas[i] for i in dict.fromkeys(requested) if i in vacunas]})
+        return FastJSONResponse(await cache.get_or_load(page.cache_key("vacunas"), lambda: paginate("Vacunas", page)))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,16 +1,57 @@
+import argparse
+import importlib.util
 import subprocess
 import sys
 
-if __name__ == "__main__":
+from core.config import settings
+
+
+def run_dev():
     # Comando para iniciar el servidor con python -m uvicorn
     command = [sys.executable, "-m", "uvicorn", "app:app", "--reload"]
     #command = [sys.executable, "-m", "uvicorn", "app:app", "--reload", "--host", "0.0.0.0", "--port", "8000"]
+    subprocess.run(command)
+
+
+def run_prod():
+    import uvicorn
 
+    # uvloop y httptools son opcionales: si no están instalados se usan asyncio y h11
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    print(f"Starting FastAPI server (prod): {settings.SERVER_WORKERS} workers, loop={loop}, http={http}")
+
+    # Con SIGTERM cada worker deja de aceptar conexiones, espera a las peticiones en curso
+    # (hasta SERVER_GRACEFUL_TIMEOUT segundos) y ejecuta el shutdown de la app
+    uvicorn.run(
+        "app:app",
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        workers=settings.SERVER_WORKERS,
+        loop=loop,
+        http=http,
+        lifespan="on",
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE_SECONDS,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+        limit_concurrency=settings.SERVER_LIMIT_CONCURRENCY or None,
+        access_log=settings.SERVER_ACCESS_LOG,
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prod", action="store_true", help="modo producción (equivale a SERVER_MODE=prod)")
+    args = parser.parse_args()
 
     try:
-        print("Starting FastAPI server...")
-        subprocess.run(command)
+        if args.prod or settings.SERVER_MODE == "prod":
+            run_prod()
+        else:
+            print("Starting FastAPI server...")
+            run_dev()
     except KeyboardInterrupt:
         print("\nServer stopped by user.")
     except Exception as e:
-        print(f"An error occurred: {e}")
\ No newline at end of file
+        print(f"An error occurred: {e}")
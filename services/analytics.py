@@ -0,0 +1,23 @@
+"""
+Agregados de actividad clínica (rollups) sobre "Historial".
+
+Los totales de visitas por día, veterinario, especie de la mascota y resultado
+viven en la tabla "HistorialResumen" (db/sql/historial_resumen.sql). Un trigger
+sobre "Historial" los actualiza en la misma transacción que cada visita nueva,
+incluidas las de ``completar_citas``; el script hace una única carga inicial.
+Al estar en la base de datos, todos los workers ven los mismos totales sin
+reconstrucciones periódicas.
+
+``resumen`` llama a la función ``resumen_historial``, que solo suma las filas
+de resumen de los días del rango: el coste depende del rango y no del tamaño
+del historial.
+"""
+from typing import Optional
+
+from db.repository import db
+
+
+async def resumen(desde: Optional[str] = None, hasta: Optional[str] = None) -> dict:
+    """Total de visitas entre ``desde`` y ``hasta`` (AAAA-MM-DD, incluidos), por mes, veterinario, especie y resultado."""
+    response = await db.rpc("resumen_historial", {"p_desde": desde, "p_hasta": hasta}, read_only=True)
+    return {"desde": desde, "hasta": hasta, **response.data}
@@ -0,0 +1,73 @@
+"""
+Inserción por lotes con resultado por fila.
+
+Cada elemento se valida con su modelo de ``models.models``; los válidos se
+insertan en sentencias de varias filas de ``BULK_CHUNK_SIZE`` elementos
+(``validate_items`` e ``insert_rows`` por separado permiten descartar filas
+entre medias, como hace ``/citas/lote`` con las que chocan). Si un
+bloque falla en la base de datos (por ejemplo, por una clave foránea inválida),
+ese bloque se reintenta fila por fila para saber exactamente cuáles fallaron.
+"""
+from typing import Any, Callable, List, Optional, Tuple, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+
+from core.config import settings
+from db.repository import db, error_message
+
+
+def check_batch_size(items: List[Any]) -> None:
+    if len(items) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Máximo {settings.BULK_MAX_ITEMS} elementos por petición")
+
+
+def validate_items(items: List[Any], model: Type[BaseModel]) -> Tuple[List[Optional[dict]], List[Tuple[int, BaseModel]]]:
+    """Devuelve los resultados ya decididos (los inválidos; None en el resto) y los válidos con su índice."""
+    resultados: List[Optional[dict]] = [None] * len(items)
+    validos = []
+    for index, raw in enumerate(items):
+        try:
+            validos.append((index, model.parse_obj(raw)))
+        except ValidationError as e:
+            resultados[index] = {"index": index, "ok": False, "error": e.errors()}
+    return resultados, validos
+
+
+async def insert_in_chunks(
+    table: str,
+    items: List[Any],
+    model: Type[BaseModel],
+    to_row: Optional[Callable[[BaseModel], dict]] = None,
+) -> List[dict]:
+    """Devuelve ``{"index", "ok": True, "data"}`` o ``{"index", "ok": False, "error"}`` por cada elemento, en orden."""
+    resultados, validos = validate_items(items, model)
+    await insert_rows(table, [(index, to_row(obj) if to_row else obj.dict()) for index, obj in validos], resultados)
+    return resultados
+
+
+async def insert_rows(table: str, validos: List[Tuple[int, dict]], resultados: List[Optional[dict]]) -> None:
+    """Inserta filas ya validadas (con su índice en la petición) y anota el resultado de cada una en ``resultados``."""
+    for start in range(0, len(validos), settings.BULK_CHUNK_SIZE):
+        bloque = validos[start:start + settings.BULK_CHUNK_SIZE]
+        try:
+            response = await db.insert(table, [row for _, row in bloque])
+            for (index, _), data in zip(bloque, response.data):
+                resultados[index] = {"index": index, "ok": True, "data": data}
+        except Exception:
+            for index, row in bloque:
+                try:
+                    response = await db.insert(table, row)
+                    resultados[index] = {"index": index, "ok": True, "data": response.data[0]}
+                except Exception as e:
+                    resultados[index] = {"index": index, "ok": False, "error": error_message(e)}
+
+
+def summary(resultados: List[dict]) -> dict:
+    insertados = sum(1 for r in resultados if r["ok"])
+    return {
+        "message": f"{insertados} de {len(resultados)} registros insertados",
+        "insertados": insertados,
+        "fallidos": len(resultados) - insertados,
+        "data": resultados,
+    }
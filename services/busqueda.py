@@ -0,0 +1,29 @@
+"""
+Búsqueda de mascotas, clientes y funcionarios por nombre o correo.
+
+La hace la función ``buscar`` de la base de datos (db/sql/busqueda.sql), sobre
+un índice invertido en las tablas "BusquedaDocumentos" y "BusquedaTerminos"
+(trigramas y prefijos de una y dos letras de ``nombre_mascota``,
+``nombre_usuario``, ``correo`` y ``nombre``, en minúsculas y sin tildes). Lo
+mantienen triggers en la misma transacción que cada escritura, así que un alta
+hecha en cualquier worker aparece al momento en todos. Con el ``FakeBackend``
+la misma función se resuelve con el índice en memoria de db/fake_search.py.
+
+Se busca cualquier fragmento de tres o más letras, y las búsquedas más cortas
+al principio de una palabra. Orden: prefijo del campo (el campo más corto
+primero, así que la coincidencia exacta va antes), prefijo de una palabra y por
+último cualquier fragmento. benchmarks/bench_busqueda.py --dsn mide la latencia
+en Postgres con 100k registros.
+"""
+from typing import Iterable, List
+
+from db.repository import db
+
+TIPOS = ("mascota", "cliente", "funcionario")
+
+
+async def buscar(query: str, limit: int, tipos: Iterable[str] = TIPOS) -> List[dict]:
+    response = await db.rpc(
+        "buscar", {"p_q": query, "p_tipos": sorted(set(tipos)), "p_limit": limit}, read_only=True,
+    )
+    return response.data or []
@@ -0,0 +1,32 @@
+"""
+Lógica compartida de citas.
+
+``completar_citas`` mueve citas de "Citas" a "Historial" con una sola llamada a
+la función ``completar_citas`` de la base de datos (db/sql/completar_citas.sql),
+que hace el borrado y la inserción en una transacción (el trigger de
+db/sql/historial_resumen.sql suma cada visita nueva a los agregados).
+"""
+from typing import List
+
+from core.cache import cache
+from db.repository import db
+from services.disponibilidad import index as disponibilidad
+from models.models import CompleteCitaData, CompletarCitaItem
+
+
+async def completar_citas(items: List[CompletarCitaItem]) -> List[dict]:
+    """Devuelve un resultado por cita: ``{"id_cita", "ok", "cita", "historial"}`` o ``{"id_cita", "ok": False, "error"}``."""
+    if not items:
+        return []
+    response = await db.rpc("completar_citas", {"p_citas": [item.dict() for item in items]})
+    resultados = response.data or []
+    for resultado in resultados:
+        if resultado["ok"]:
+            disponibilidad.remove(resultado["cita"])
+    if any(r["ok"] for r in resultados):
+        cache.invalidate("dashboard")
+    return resultados
+
+
+async def completar_cita(id_cita: int, data: CompleteCitaData) -> dict:
+    return (await completar_citas([CompletarCitaItem(id_cita=id_cita, **data.dict())]))[0]
@@ -0,0 +1,126 @@
+"""
+Índice de disponibilidad de veterinarios.
+
+Para cada (veterinario, fecha) se guarda la lista ordenada de horas de inicio
+(en minutos desde medianoche) de sus citas. La lista se carga de la base de
+datos la primera vez que se consulta ese día y luego se mantiene al crear,
+cancelar o completar citas. Con la lista ordenada, comprobar si una hora choca
+con otra cita es una búsqueda binaria.
+
+Cada cita ocupa ``CITA_DURACION_MINUTOS``. Los días cargados se limitan a
+``DISPONIBILIDAD_MAX_DIAS`` (LRU); un día expulsado se vuelve a cargar al usarse.
+
+El índice es por proceso y no ve las citas que crean otros workers. Por eso un
+día cargado se vuelve a leer pasados ``DISPONIBILIDAD_TTL_SECONDS`` (es lo más
+desactualizado que puede estar ``GET /citas/disponibilidad``), y las altas lo
+releen con ``reload`` dentro del lock antes de comprobar. La garantía contra
+citas solapadas es el trigger de db/sql/citas_sin_solapamiento.sql, que
+comprueba cada alta en la base de datos; el índice solo adelanta el error.
+"""
+import asyncio
+import bisect
+from collections import OrderedDict
+from datetime import time
+from time import monotonic
+from typing import Dict, List, Optional, Tuple
+
+from core.config import settings
+from db.repository import db
+
+Key = Tuple[int, str]
+
+
+def to_minutes(hora: str) -> int:
+    parsed = time.fromisoformat(str(hora))
+    return parsed.hour * 60 + parsed.minute
+
+
+def to_hora(minutos: int) -> str:
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+class AvailabilityIndex:
+    def __init__(self, duration: int, max_days: int, ttl: float):
+        self.duration = duration
+        self.max_days = max_days
+        self.ttl = ttl
+        self._days: "OrderedDict[Key, Tuple[float, List[int]]]" = OrderedDict()  # clave -> (cargado, horas)
+        self._locks: Dict[Key, asyncio.Lock] = {}
+
+    def lock(self, veterinario: int, fecha: str) -> asyncio.Lock:
+        """Serializa comprobación + inserción de citas para un mismo veterinario y día."""
+        return self._locks.setdefault((veterinario, fecha), asyncio.Lock())
+
+    async def reload(self, veterinario: int, fecha: str) -> List[int]:
+        """Vuelve a leer el día de la base de datos, con las citas que hayan creado otros workers."""
+        key = (veterinario, fecha)
+        response = await db.select(
+            "Citas", "id, hora_cita",
+            filters=[("id_veterinario", "eq", veterinario), ("fecha_cita", "eq", fecha)],
+        )
+        slots = sorted(to_minutes(row["hora_cita"]) for row in response.data)
+        self._days[key] = (monotonic(), slots)
+        self._days.move_to_end(key)
+        while len(self._days) > self.max_days:
+            evicted, _ = self._days.popitem(last=False)
+            lock = self._locks.get(evicted)
+            if lock is not None and not lock.locked():
+                del self._locks[evicted]
+        return slots
+
+    async def _day(self, veterinario: int, fecha: str) -> List[int]:
+        key = (veterinario, fecha)
+        entry = self._days.get(key)
+        if entry is None or monotonic() - entry[0] >= self.ttl:
+            return await self.reload(veterinario, fecha)
+        self._days.move_to_end(key)
+        return entry[1]
+
+    def _conflict(self, slots: List[int], start: int) -> Optional[int]:
+        i = bisect.bisect_left(slots, start)
+        if i < len(slots) and slots[i] < start + self.duration:
+            return slots[i]
+        if i > 0 and slots[i - 1] + self.duration > start:
+            return slots[i - 1]
+        return None
+
+    async def conflict(self, veterinario: int, fecha: str, hora: str) -> Optional[str]:
+        """
+        Devuelve la hora de la cita con la que choca, o None si el hueco está libre.
+        Antes de insertar, llamar a ``reload`` dentro de ``lock`` para no decidir con datos de hace ``ttl`` segundos.
+        """
+        slots = await self._day(veterinario, fecha)
+        choque = self._conflict(slots, to_minutes(hora))
+        return None if choque is None else to_hora(choque)
+
+    async def availability(self, veterinario: int, fecha: str) -> dict:
+        slots = await self._day(veterinario, fecha)
+        inicio = to_minutes(settings.JORNADA_INICIO)
+        fin = to_minutes(settings.JORNADA_FIN)
+        libres = [
+            to_hora(minuto)
+            for minuto in range(inicio, fin - self.duration + 1, self.duration)
+            if self._conflict(slots, minuto) is None
+        ]
+        return {"ocupadas": [to_hora(m) for m in slots], "libres": libres}
+
+    def add(self, cita: dict) -> None:
+        entry = self._days.get((cita.get("id_veterinario"), cita.get("fecha_cita")))
+        if entry is not None:  # los días no cargados se leerán completos al usarse
+            bisect.insort(entry[1], to_minutes(cita["hora_cita"]))
+
+    def remove(self, cita: dict) -> None:
+        entry = self._days.get((cita.get("id_veterinario"), cita.get("fecha_cita")))
+        if entry is None:
+            return
+        slots = entry[1]
+        minuto = to_minutes(cita["hora_cita"])
+        i = bisect.bisect_left(slots, minuto)
+        if i < len(slots) and slots[i] == minuto:
+            del slots[i]
+
+    def clear(self) -> None:
+        self._days.clear()
+
+
+index = AvailabilityIndex(settings.CITA_DURACION_MINUTOS, settings.DISPONIBILIDAD_MAX_DIAS, settings.DISPONIBILIDAD_TTL_SECONDS)
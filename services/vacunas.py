@@ -0,0 +1,49 @@
+"""
+Catálogo en memoria de la tabla ``Vacunas``.
+
+La tabla es pequeña y casi no cambia, así que se carga completa en la caché
+(``catalogo_vacunas``, con TTL ``VACUNAS_CATALOGO_TTL``) y se usa para adjuntar
+los datos de cada vacuna a las filas de ``VacunasMascotas`` sin una consulta
+por fila. Si se pide un id que el catálogo todavía no conoce (vacuna creada
+después de la última carga), se consulta y se fuerza la recarga del catálogo.
+"""
+from typing import Dict, Iterable, List
+
+from core.cache import cache
+from core.config import settings
+from core.pagination import iter_pages
+from db.repository import db
+
+CATALOG_KEY = "catalogo_vacunas"
+
+
+async def _load_catalog() -> Dict[int, dict]:
+    catalog = {}
+    async for rows in iter_pages("Vacunas"):
+        for row in rows:
+            catalog[row["id"]] = row
+    return catalog
+
+
+async def get_catalog() -> Dict[int, dict]:
+    return await cache.get_or_load(CATALOG_KEY, _load_catalog, ttl=settings.VACUNAS_CATALOGO_TTL)
+
+
+async def resolve(ids: Iterable[int]) -> Dict[int, dict]:
+    """Devuelve ``{id: vacuna}`` para los ids que existen."""
+    ids = set(ids)
+    catalog = await get_catalog()
+    found = {i: catalog[i] for i in ids if i in catalog}
+    missing = [i for i in ids if i not in catalog]
+    if missing:
+        response = await db.select("Vacunas", filters=[("id", "in", missing)])
+        if response.data:
+            cache.invalidate(CATALOG_KEY)
+            found.update({row["id"]: row for row in response.data})
+    return found
+
+
+async def with_details(rows: List[dict]) -> List[dict]:
+    """Añade ``detalle_vacuna`` a cada fila de ``VacunasMascotas``."""
+    vacunas = await resolve(row["vacuna"] for row in rows)
+    return [{**row, "detalle_vacuna": vacunas.get(row["vacuna"])} for row in rows]
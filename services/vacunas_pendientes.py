@@ -0,0 +1,143 @@
+"""
+Próximas dosis de vacunas, precalculadas.
+
+Para cada (mascota, vacuna) se toma la aplicación más reciente de
+``VacunasMascotas`` (columna de fecha ``VACUNAS_FECHA_CAMPO``) y se le suma el
+intervalo de refuerzo de la vacuna (columna ``VACUNAS_INTERVALO_CAMPO`` de
+``Vacunas``, o ``VACUNAS_INTERVALO_DIAS`` si no la tiene; 0 = sin refuerzo).
+
+El resultado se guarda en la tabla ``VacunasPendientes``
+(db/sql/vacunas_pendientes.sql), que comparten todos los workers; ``GET
+/vacunas/pendientes`` la lee paginando como los demás listados. ``refresh``
+recalcula solo las mascotas afectadas por una asociación de vacuna o un alta o
+edición de mascota. ``recompute`` hace el cálculo completo en una pasada por
+páginas (p. ej. tras cambiar el intervalo de una vacuna del catálogo);
+``run_periodically`` lo lanza cada ``VACUNAS_PENDIENTES_INTERVALO`` segundos
+en un solo worker: la ejecución se reserva en la tabla ``TareasPeriodicas``, así
+que los demás se la saltan aunque arranquen a la vez (p. ej. en un despliegue).
+"""
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from core.config import settings
+from core.pagination import iter_pages
+from db.repository import db
+from services import vacunas as vacunas_service
+
+TABLE = "VacunasPendientes"
+TAREA = "vacunas_pendientes.recompute"
+
+
+def _parse_date(value) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _interval(vacuna: Optional[dict]) -> int:
+    value = (vacuna or {}).get(settings.VACUNAS_INTERVALO_CAMPO)
+    return settings.VACUNAS_INTERVALO_DIAS if value is None else int(value)
+
+
+class DueVaccines:
+    @staticmethod
+    def _compute(aplicaciones: Iterable[dict], mascotas: Dict[int, dict], catalogo: Dict[int, dict]) -> List[dict]:
+        # Última aplicación de cada (mascota, vacuna)
+        ultimas: Dict[tuple, tuple] = {}
+        for row in aplicaciones:
+            fecha = _parse_date(row.get(settings.VACUNAS_FECHA_CAMPO))
+            if fecha is None:
+                continue
+            key = (row["mascota"], row["vacuna"])
+            if key not in ultimas or (fecha, row["id"]) > ultimas[key][:2]:
+                ultimas[key] = (fecha, row["id"])
+
+        items = []
+        for (id_mascota, id_vacuna), (fecha, row_id) in ultimas.items():
+            vacuna = catalogo.get(id_vacuna)
+            dias = _interval(vacuna)
+            if dias <= 0:
+                continue
+            mascota = mascotas.get(id_mascota, {})
+            items.append({
+                "id": row_id,
+                "mascota": id_mascota,
+                "nombre_mascota": mascota.get("nombre_mascota"),
+                "id_dueño": mascota.get("id_dueño"),
+                "vacuna": id_vacuna,
+                "nombre_vacuna": (vacuna or {}).get("nombre"),
+                "ultima_aplicacion": fecha.isoformat(),
+                "proxima_dosis": (fecha + timedelta(days=dias)).isoformat(),
+            })
+        return items
+
+    @staticmethod
+    async def _store(mascota_ids: List[int], items: List[dict], calculado: Optional[str] = None) -> None:
+        # Borrado e inserción en una sola transacción de la base de datos
+        await db.rpc("vacunas_pendientes_reemplazar", {"p_mascotas": mascota_ids, "p_filas": items, "p_calculado": calculado})
+
+    async def recompute(self, calculado: Optional[str] = None) -> None:
+        """
+        Cálculo completo: recorre Mascotas y VacunasMascotas una sola vez, por páginas, y reescribe la tabla por bloques.
+        ``calculado`` es la hora de inicio; las mascotas refrescadas después no se tocan.
+        """
+        calculado = calculado or datetime.now(timezone.utc).isoformat()
+        catalogo = await vacunas_service.get_catalog()
+        mascotas = {}
+        async for rows in iter_pages("Mascotas", columns="id, nombre_mascota, id_dueño", page_size=settings.EXPORT_PAGE_SIZE):
+            for row in rows:
+                mascotas[row["id"]] = row
+        aplicaciones = []
+        columns = f"id, mascota, vacuna, {settings.VACUNAS_FECHA_CAMPO}"
+        async for rows in iter_pages("VacunasMascotas", columns=columns, page_size=settings.EXPORT_PAGE_SIZE):
+            aplicaciones.extend(rows)
+
+        por_mascota: Dict[int, List[dict]] = {id_mascota: [] for id_mascota in mascotas}
+        for item in self._compute(aplicaciones, mascotas, catalogo):
+            por_mascota.setdefault(item["mascota"], []).append(item)
+        # Las mascotas sin dosis pendientes también se incluyen, para borrar sus filas antiguas
+        ids = sorted(por_mascota)
+        for start in range(0, len(ids), settings.EXPORT_PAGE_SIZE):
+            bloque = ids[start:start + settings.EXPORT_PAGE_SIZE]
+            await self._store(bloque, [item for id_mascota in bloque for item in por_mascota[id_mascota]], calculado)
+
+    async def refresh(self, mascota_ids: Iterable[int]) -> None:
+        """Recalcula solo las mascotas indicadas (tras asociar vacunas o crear y editar mascotas)."""
+        mascota_ids = sorted(set(mascota_ids))
+        if not mascota_ids:
+            return
+        catalogo = await vacunas_service.get_catalog()
+        mascotas_resp, aplicaciones_resp = await asyncio.gather(
+            db.select("Mascotas", "id, nombre_mascota, id_dueño", filters=[("id", "in", mascota_ids)]),
+            db.select(
+                "VacunasMascotas", f"id, mascota, vacuna, {settings.VACUNAS_FECHA_CAMPO}",
+                filters=[("mascota", "in", mascota_ids)],
+            ),
+        )
+        mascotas = {row["id"]: row for row in mascotas_resp.data}
+        if any(row["vacuna"] not in catalogo for row in aplicaciones_resp.data):
+            catalogo = await vacunas_service.resolve(row["vacuna"] for row in aplicaciones_resp.data)
+        await self._store(mascota_ids, self._compute(aplicaciones_resp.data, mascotas, catalogo))
+
+    @staticmethod
+    async def _reserve(interval: float) -> Optional[str]:
+        # Hora de inicio si este worker se queda con la ejecución, o None si otro ya la hizo en el intervalo
+        response = await db.rpc("tarea_periodica_reservar", {"p_nombre": TAREA, "p_intervalo": interval})
+        return response.data or None
+
+    async def run_periodically(self, interval: float) -> None:
+        while True:
+            try:
+                calculado = await self._reserve(interval)
+                if calculado is not None:
+                    await self.recompute(calculado)
+            except Exception as e:
+                print(f"Error calculando las próximas dosis de vacunas: {str(e)}")
+            await asyncio.sleep(interval)
+
+
+pendientes = DueVaccines()